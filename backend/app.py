@@ -0,0 +1,136 @@
+"""
+Single Flask app serving every backend route.
+
+The catalog, image, chat, finance and dealer-call blueprints used to be split
+between cheryl.py (port 5000) and sai.py (port 5001), each with its own
+Firestore client, caches and loaded models. They now share one process, so the
+loan model, RAG embeddings, TTL caches and pooled HTTP sessions are loaded once.
+
+Development:
+    python app.py                  # serves the same app on ports 5000 and 5001
+
+Production (preloaded, copy-on-write friendly workers, see gunicorn.conf.py):
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+# Blueprints read API keys at import time
+load_dotenv()
+
+from flask import Flask, Response, g, request
+from flask_cors import CORS
+from werkzeug.serving import run_simple
+
+import catalog_arrays
+import dealer_calls
+import http_caching
+import http_client
+import log_config
+import metrics
+import predict_loan
+import profiling
+import recommender
+import trade_in
+from routes import calls, catalog, finance, images, recommendations
+
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000")
+# The frontend still calls both of the old ports
+DEV_PORTS = [int(p) for p in os.getenv("DEV_PORTS", "5000,5001").split(",")]
+
+log = logging.getLogger(__name__)
+
+
+def _upstream_collector():
+    samples = [({"host": host}, 1 if state["state"] == "open" else 0)
+               for host, state in http_client.breaker_states().items()]
+    jobs = dealer_calls.stats()
+    return [
+        ("http_breaker_open", "gauge", "1 while the host's circuit breaker is open", samples),
+        ("dealer_call_jobs_pending", "gauge", "Dealer calls queued or running", [({}, jobs["pending"])]),
+    ]
+
+
+metrics.register_collector(metrics.cache_collector({
+    "gas-price": finance.gas_price_cache.stats,
+    "trade-in": trade_in.trade_in_cache.stats,
+    "loan-prediction": predict_loan.cache_stats,
+    "recommendation-sessions": recommender.sessions.stats,
+    "catalog-snapshot": catalog_arrays.stats,
+}))
+metrics.register_collector(_upstream_collector)
+
+
+def create_app(with_chat=True):
+    """The API. with_chat=False leaves out /ask, and with it the embedding model and Chroma."""
+    log_config.setup_logging()
+    app = Flask(__name__)
+    CORS(app, origins=CORS_ORIGINS.split(",") if CORS_ORIGINS != "*" else "*")
+
+    for blueprint in (catalog.bp, images.bp, finance.bp, calls.bp, recommendations.bp):
+        app.register_blueprint(blueprint)
+    if with_chat:
+        # Imports rag_model, which loads MiniLM (downloading it the first time)
+        from routes import chat
+        app.register_blueprint(chat.bp)
+
+    @app.before_request
+    def bind_request_fields():
+        g.request_start = time.perf_counter()
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        log_config.clear()
+        log_config.bind(request_id=request_id, method=request.method, path=request.path)
+        # Label by URL rule, not path, so /data/cars/<hack_id> stays one series
+        g.route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.IN_FLIGHT.inc("route", g.route)
+
+    @app.after_request
+    def log_request(response):
+        fields = log_config.context()
+        response.headers["X-Request-ID"] = fields.get("request_id", "")
+        duration_ms = (time.perf_counter() - g.request_start) * 1000 if "request_start" in g else None
+        log.info("request", extra={"status": response.status_code,
+                                   "duration_ms": round(duration_ms, 2) if duration_ms is not None else None})
+        g.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(error=None):
+        # Runs even when the handler raised, so the in-flight gauge always comes back down
+        if "route" not in g:
+            return
+        metrics.IN_FLIGHT.dec("route", g.route)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start,
+                                        g.route, request.method, str(g.get("status", 500)))
+
+    http_caching.install(app)
+    profiling.install(app)
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route('/upstreams', methods=['GET'])
+    def upstream_stats():
+        # Per-host pool/latency/error stats for outbound calls made by this worker
+        return http_client.host_stats(), 200
+
+    # Load the loan model now rather than on the first request (and before a
+    # preloading server forks, so workers share its pages)
+    predict_loan._load_model()
+    return app
+
+
+if __name__ == "__main__":
+    app = create_app()
+    debug = os.getenv("FLASK_DEBUG", "0") == "1"
+    for port in DEV_PORTS[1:]:
+        threading.Thread(target=run_simple, args=("0.0.0.0", port, app),
+                         kwargs={"threaded": True}, daemon=True).start()
+    run_simple("0.0.0.0", DEV_PORTS[0], app, threaded=True,
+               use_debugger=debug, use_reloader=False)
@@ -3,6 +3,8 @@ import csv
 import json
 from typing import Any, Dict, List
 
+from car_schema import coerce_car
+
 def _convert_value(val: str) -> Any:
     """Try to convert string to int, float, bool, or None; otherwise return original string."""
     if val is None:
@@ -25,13 +27,30 @@ def _convert_value(val: str) -> Any:
         pass
     return v
 
-def csv_to_json(input_path: str, output_path: str) -> None:
+def _expand_car(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode the JSON "data" column of a cars export row and coerce it with the car schema."""
+    try:
+        data = json.loads(row["data"])
+    except (TypeError, ValueError):
+        return row
+    car, errors = coerce_car(data)
+    if car is None:
+        return row
+    expanded = dict(row, data=car)
+    if errors:
+        expanded["errors"] = errors
+    return expanded
+
+def csv_to_json(input_path: str, output_path: str, expand_cars: bool = False) -> None:
     """Read CSV and write JSON array of objects."""
     rows: List[Dict[str, Any]] = []
     # handle possible BOM with utf-8-sig
     with open(input_path, newline='', encoding='utf-8-sig') as f:
         reader = csv.DictReader(f)
         for r in reader:
+            if expand_cars and r.get("collection_path") == "cars":
+                rows.append(_expand_car(r))
+                continue
             converted = {k: _convert_value(v) for k, v in r.items()}
             rows.append(converted)
     with open(output_path, "w", encoding="utf-8") as out:
@@ -47,8 +66,12 @@ def main():
         "-o", "--output", default="backup.json",
         help="Path to output JSON file (default: backup.json)"
     )
+    parser.add_argument(
+        "--expand-cars", action="store_true",
+        help="Decode the data column of cars rows into typed objects using the car schema"
+    )
     args = parser.parse_args()
-    csv_to_json(args.input, args.output)
+    csv_to_json(args.input, args.output, expand_cars=args.expand_cars)
 
 if __name__ == "__main__":
     main()
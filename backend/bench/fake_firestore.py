@@ -0,0 +1,257 @@
+"""
+In-memory stand-in for the parts of google.cloud.firestore.Client the API uses.
+
+Documents are plain dicts held per collection. Reads return copies, queries
+order by document id like Firestore does, and every call can be slowed down by
+a fixed latency to approximate a real round-trip.
+"""
+import copy
+import threading
+import time
+
+
+class AlreadyExists(Exception):
+    """Same name as google.api_core.exceptions.AlreadyExists, which callers match on."""
+
+
+class NotFound(Exception):
+    pass
+
+
+def _names(field_paths):
+    return None if field_paths is None else {f.strip("`") for f in field_paths}
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self, field_paths=None, transaction=None):
+        self._collection._client._delay()
+        with self._collection._client._lock:
+            data = self._collection._docs.get(self.id)
+            if data is not None and field_paths is not None:
+                data = {k: v for k, v in data.items() if k in _names(field_paths)}
+            return DocumentSnapshot(self, copy.deepcopy(data))
+
+    def set(self, data, merge=False):
+        self._collection._client._delay()
+        self._collection._write(self.id, data, merge=merge)
+
+    def update(self, data):
+        self._collection._client._delay()
+        with self._collection._client._lock:
+            if self.id not in self._collection._docs:
+                raise NotFound(self.id)
+        self._collection._write(self.id, data, merge=True)
+
+    def create(self, data):
+        self._collection._client._delay()
+        with self._collection._client._lock:
+            if self.id in self._collection._docs:
+                raise AlreadyExists(self.id)
+            self._collection._docs[self.id] = copy.deepcopy(data)
+            self._collection._sorted = None
+
+    def delete(self):
+        self._collection._client._delay()
+        with self._collection._client._lock:
+            self._collection._docs.pop(self.id, None)
+            self._collection._sorted = None
+
+
+class Query:
+    def __init__(self, collection, limit=None, offset=0, fields=None):
+        self._collection = collection
+        self._limit = limit
+        self._offset = offset
+        self._fields = fields
+
+    def limit(self, count):
+        return Query(self._collection, count, self._offset, self._fields)
+
+    def offset(self, count):
+        return Query(self._collection, self._limit, count, self._fields)
+
+    def select(self, field_paths):
+        return Query(self._collection, self._limit, self._offset, _names(field_paths))
+
+    def stream(self):
+        client = self._collection._client
+        client._delay()
+        with client._lock:
+            ids = self._collection._ids()
+            end = None if self._limit is None else self._offset + self._limit
+            snapshots = []
+            for doc_id in ids[self._offset:end]:
+                data = self._collection._docs[doc_id]
+                if self._fields is not None:
+                    data = {k: v for k, v in data.items() if k in self._fields}
+                snapshots.append(DocumentSnapshot(DocumentReference(self._collection, doc_id), copy.deepcopy(data)))
+        return iter(snapshots)
+
+
+class CollectionReference(Query):
+    def __init__(self, client, name):
+        super().__init__(self)
+        self._client = client
+        self.id = name
+        self._docs = {}
+        self._sorted = None
+
+    def document(self, doc_id):
+        return DocumentReference(self, doc_id)
+
+    def _ids(self):
+        if self._sorted is None:
+            self._sorted = sorted(self._docs)
+        return self._sorted
+
+    def _write(self, doc_id, data, merge=False):
+        with self._client._lock:
+            if merge and doc_id in self._docs:
+                self._docs[doc_id].update(copy.deepcopy(data))
+            else:
+                self._docs[doc_id] = copy.deepcopy(data)
+            self._sorted = None
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, data, merge=False):
+        self._ops.append(("set", reference, data, merge))
+
+    def update(self, reference, data):
+        self._ops.append(("set", reference, data, True))
+
+    def delete(self, reference):
+        self._ops.append(("delete", reference, None, False))
+
+    def commit(self):
+        self._client._delay()
+        for op, reference, data, merge in self._ops:
+            if op == "set":
+                reference._collection._write(reference.id, data, merge=merge)
+            else:
+                with self._client._lock:
+                    reference._collection._docs.pop(reference.id, None)
+                    reference._collection._sorted = None
+        self._ops = []
+
+
+class BulkWriter:
+    """Applies writes as they are queued; there are no failures to report."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def on_write_error(self, callback):
+        pass
+
+    def set(self, reference, data, merge=False):
+        reference.set(data, merge=merge)
+
+    def update(self, reference, data):
+        reference.update(data)
+
+    def delete(self, reference):
+        reference.delete()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Transaction(WriteBatch):
+    """
+    Enough of firestore.Transaction for @firestore.transactional. Transactions
+    hold one client-wide lock from begin to commit, so they never conflict.
+    """
+
+    _read_only = False
+    _max_attempts = 5
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+
+    def _clean_up(self):
+        self._ops = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._client._transaction_lock.acquire()
+        self._id = id(self)
+
+    def _commit(self):
+        try:
+            self.commit()
+        finally:
+            self._clean_up()
+            self._client._transaction_lock.release()
+
+    def _rollback(self):
+        if self._id is not None:
+            self._clean_up()
+            self._client._transaction_lock.release()
+
+
+class FakeFirestore:
+    """Drop-in for firestore.Client(); pass to database.set_db()."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+        self._collections = {}
+        self._lock = threading.RLock()
+        self._transaction_lock = threading.Lock()
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = CollectionReference(self, name)
+            return self._collections[name]
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def bulk_writer(self):
+        return BulkWriter(self)
+
+    def transaction(self):
+        return Transaction(self)
+
+    def get_all(self, references, field_paths=None):
+        self._delay()
+        for reference in references:
+            with self._lock:
+                data = reference._collection._docs.get(reference.id)
+                if data is not None and field_paths is not None:
+                    data = {k: v for k, v in data.items() if k in _names(field_paths)}
+                yield DocumentSnapshot(reference, copy.deepcopy(data))
@@ -0,0 +1,336 @@
+"""
+Offline load test for the API.
+
+Starts the upstream stub server, an in-memory Firestore (or uses the emulator
+when FIRESTORE_EMULATOR_HOST is set), seeds the cars collection from
+data/car_data_processed.csv, serves the unified app on a local port and drives
+a weighted traffic mix at a fixed concurrency. Results (throughput, error count
+and p50/p95/p99 latency per route) are printed and written as JSON so two runs
+can be compared.
+
+    cd backend
+    python -m bench.run --duration 30 --concurrency 16 --out bench/results/before.json
+    python -m bench.run --duration 30 --concurrency 16 --compare bench/results/before.json
+
+    # slow, flaky gas price API and 20ms Firestore round-trips
+    python -m bench.run --upstream gas=300:100:0.05 --firestore-latency-ms 20
+
+--url drives an already running server instead (no stubs, seeding or app).
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATALOG_PATH = os.path.join(BASE_DIR, "data", "car_data_processed.csv")
+
+MIXES = {
+    "default": {"grid": 30, "details": 25, "ask": 10, "loan": 15, "gas": 10, "compare": 10},
+    "browse": {"grid": 50, "details": 35, "compare": 15},
+    # Everything except /ask, for machines without the embedding model
+    "no-ask": {"grid": 30, "details": 25, "loan": 20, "gas": 15, "compare": 10},
+}
+
+QUESTIONS = [
+    "What is the cheapest hybrid with at least 5 seats?",
+    "Which SUV has the best fuel economy?",
+    "I need a truck that can tow 6000 pounds",
+    "Best value sedan for a new driver",
+    "Which cars hold their value best until 2027?",
+]
+CITIES = [("dallas", "tx"), ("austin", "tx"), ("houston", "tx"), ("chicago", "il"), ("denver", "co"),
+          ("seattle", "wa"), ("miami", "fl"), ("phoenix", "az"), ("boston", "ma"), ("atlanta", "ga")]
+COMPARE_SIZE = 3
+
+
+def parse_mix(spec):
+    if spec in MIXES:
+        return MIXES[spec]
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def parse_upstream(specs):
+    """['gas=300:100:0.05', ...] -> {name: UpstreamProfile(latency, jitter, error rate)}"""
+    from bench.stubs import UPSTREAMS, UpstreamProfile
+    profiles = {}
+    for spec in specs:
+        name, values = spec.split("=")
+        if name not in UPSTREAMS:
+            raise SystemExit(f"Unknown upstream {name}, expected one of {', '.join(UPSTREAMS)}")
+        numbers = [float(v) for v in values.split(":")] + [0.0, 0.0]
+        profiles[name] = UpstreamProfile(latency_ms=numbers[0], jitter_ms=numbers[1], error_rate=numbers[2])
+    return profiles
+
+
+def seed_catalog(db, warm_images=True):
+    """Write every valid CSV row to the cars collection. Returns the hack-ids written."""
+    from car_schema import read_car_csv
+    hack_ids = []
+    batch, size = db.batch(), 0
+    for _line, doc, _errors in read_car_csv(CATALOG_PATH):
+        if doc is None:
+            continue
+        if warm_images and not doc.get("img_path"):
+            # Most production cars already have an image; --cold-images measures the first visit
+            doc["img_path"] = "bench.jpg"
+        batch.set(db.collection("cars").document(doc["hack-id"]), doc)
+        hack_ids.append(doc["hack-id"])
+        size += 1
+        if size >= 500:
+            batch.commit()
+            batch, size = db.batch(), 0
+    if size:
+        batch.commit()
+    return hack_ids
+
+
+# Each operation returns (route label, HTTP status) and may issue several calls
+def op_grid(session, base, ctx):
+    page = ctx.rng.randint(1, ctx.pages)
+    return "grid", session.get(f"{base}/data/cars", params={"page": page}, timeout=60).status_code
+
+
+def op_details(session, base, ctx):
+    hack_id = ctx.rng.choice(ctx.hack_ids)
+    return "details", session.get(f"{base}/data/cars/{quote(hack_id, safe='')}", timeout=60).status_code
+
+
+def op_compare(session, base, ctx):
+    # A compare or swipe session loads all its cars with one batchGet
+    hack_ids = ctx.rng.sample(ctx.hack_ids, COMPARE_SIZE)
+    return "compare", session.post(f"{base}/data/cars:batchGet", json={"hack_ids": hack_ids}, timeout=60).status_code
+
+
+def op_ask(session, base, ctx):
+    resp = session.post(f"{base}/ask", json={"question": ctx.rng.choice(QUESTIONS)}, timeout=120)
+    return "ask", resp.status_code
+
+
+def op_loan(session, base, ctx):
+    payload = {
+        "annualIncome": str(ctx.rng.randrange(30000, 200000, 1000)),
+        "creditScore": str(ctx.rng.randint(300, 900)),
+        "loanAmount": str(ctx.rng.randrange(20000, 70000, 500)),
+        "loanTerm": ctx.rng.randint(3, 7),
+        "isCollegeGrad": ctx.rng.random() < 0.5,
+        "isSelfEmployed": ctx.rng.random() < 0.2,
+    }
+    return "loan", session.post(f"{base}/predict/loan", json=payload, timeout=60).status_code
+
+
+def op_gas(session, base, ctx):
+    city, state = ctx.rng.choice(CITIES)
+    return "gas", session.get(f"{base}/gas-price", params={"city": city, "state": state}, timeout=60).status_code
+
+
+OPERATIONS = {"grid": op_grid, "details": op_details, "compare": op_compare,
+              "ask": op_ask, "loan": op_loan, "gas": op_gas}
+
+
+class _Context:
+    def __init__(self, hack_ids, seed):
+        self.hack_ids = [h for h in hack_ids if "/" not in h]  # a slash can't be routed as <hack_id>
+        self.pages = max(1, (len(hack_ids) + 15) // 16)
+        self.rng = random.Random(seed)
+
+
+def drive(base, mix, hack_ids, concurrency, duration, warmup, seed=0):
+    """Run the mix for warmup + duration seconds. Returns {route: [(latency_s, status), ...]}, elapsed."""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    record_from = start + warmup
+    stop_at = record_from + duration
+
+    def worker(index):
+        ctx = _Context(hack_ids, seed + index)
+        session = requests.Session()
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = ctx.rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                route, status = OPERATIONS[name](session, base, ctx)
+            except requests.RequestException:
+                route, status = name, 0
+            latency = time.perf_counter() - t0
+            if t0 >= record_from:
+                with lock:
+                    samples[route].append((latency, status))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - record_from
+
+
+def summarize(samples, elapsed):
+    routes = {}
+    everything = []
+    for route, rows in sorted(samples.items()):
+        if not rows:
+            continue
+        latencies = np.array([r[0] for r in rows]) * 1000
+        errors = sum(1 for _, status in rows if status == 0 or status >= 500)
+        everything.extend(latencies)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        routes[route] = {
+            "requests": len(rows), "errors": errors, "throughput_rps": round(len(rows) / elapsed, 2),
+            "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies.max()), 2),
+        }
+    total = {"requests": sum(r["requests"] for r in routes.values()),
+             "errors": sum(r["errors"] for r in routes.values())}
+    total["throughput_rps"] = round(total["requests"] / elapsed, 2) if elapsed else 0.0
+    if everything:
+        p50, p95, p99 = np.percentile(everything, [50, 95, 99])
+        total.update(p50_ms=round(float(p50), 2), p95_ms=round(float(p95), 2), p99_ms=round(float(p99), 2))
+    return routes, total
+
+
+def print_report(routes, total, baseline=None):
+    header = f"{'route':<10}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for route, r in list(routes.items()) + [("TOTAL", total)]:
+        line = (f"{route:<10}{r['requests']:>8}{r['errors']:>6}{r['throughput_rps']:>9.1f}"
+                f"{r.get('p50_ms', 0):>10.1f}{r.get('p95_ms', 0):>10.1f}{r.get('p99_ms', 0):>10.1f}")
+        old = (baseline or {}).get("total" if route == "TOTAL" else "routes", {})
+        old = old if route == "TOTAL" else old.get(route)
+        if old and old.get("p95_ms"):
+            line += f"   p95 {100 * (r['p95_ms'] - old['p95_ms']) / old['p95_ms']:+.1f}%"
+            line += f"  rps {100 * (r['throughput_rps'] - old['throughput_rps']) / max(old['throughput_rps'], 1e-9):+.1f}%"
+        print(line)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def start_local_stack(args, with_chat=True):
+    """Stubs, Firestore and the app on a free port. Returns (base url, hack ids, stubs, server)."""
+    from bench.stubs import StubServer
+
+    stubs = StubServer(profiles=parse_upstream(args.upstream)).start()
+    # Read at import time by http_client, rag_model and the blueprints
+    os.environ["HTTP_HOST_OVERRIDES"] = stubs.host_overrides()
+    os.environ["GEMINI_API_ENDPOINT"] = stubs.base_url
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ["IMAGES_DIR"] = tempfile.mkdtemp(prefix="bench-images-")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_LEVELS", "werkzeug=WARNING")
+    os.environ.setdefault("DEALER_CALL_STORE", "memory")
+
+    import database
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        db = database.get_db()
+        print(f"Using Firestore emulator at {os.environ['FIRESTORE_EMULATOR_HOST']}")
+    else:
+        from bench.fake_firestore import FakeFirestore
+        db = FakeFirestore(latency_ms=args.firestore_latency_ms)
+        database.set_db(db)
+    hack_ids = seed_catalog(db, warm_images=not args.cold_images)
+    print(f"Seeded {len(hack_ids)} cars")
+
+    from werkzeug.serving import make_server
+    from app import create_app
+    server = make_server("127.0.0.1", 0, create_app(with_chat=with_chat), threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", hack_ids, stubs, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against stubbed upstreams")
+    parser.add_argument("--mix", default="default",
+                        help=f"{', '.join(MIXES)} or weights like grid=3,details=2 (default: default)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before that")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--upstream", action="append", default=[], metavar="NAME=LATENCY[:JITTER[:ERROR_RATE]]",
+                        help="Stub behaviour in ms, e.g. gas=300:100:0.05; repeatable")
+    parser.add_argument("--firestore-latency-ms", type=float, default=5,
+                        help="Added to every in-memory Firestore call (default 5)")
+    parser.add_argument("--cold-images", action="store_true",
+                        help="Leave img_path empty so every car's first view fetches its image")
+    parser.add_argument("--url", help="Drive an already running server instead of starting one")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    stubs = server = None
+    if args.url:
+        base = args.url.rstrip("/")
+        from car_schema import read_car_csv
+        hack_ids = [doc["hack-id"] for _, doc, _ in read_car_csv(CATALOG_PATH) if doc is not None]
+    else:
+        # Without /ask traffic, don't load the embedding model at all
+        base, hack_ids, stubs, server = start_local_stack(args, with_chat=mix.get("ask", 0) > 0)
+
+    print(f"Driving {base} with mix {mix} at concurrency {args.concurrency} for {args.duration}s")
+    samples, elapsed = drive(base, mix, hack_ids, args.concurrency, args.duration, args.warmup, args.seed)
+    routes, total = summarize(samples, elapsed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(routes, total, baseline)
+
+    if stubs is not None:
+        print(f"Upstream stub calls: {stubs.requests}")
+    if args.out:
+        result = {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "config": {"mix": mix, "concurrency": args.concurrency, "duration": args.duration,
+                       "warmup": args.warmup, "seed": args.seed, "upstream": args.upstream,
+                       "firestore": "external" if args.url else
+                       ("emulator" if os.getenv("FIRESTORE_EMULATOR_HOST") else "memory"),
+                       "firestore_latency_ms": args.firestore_latency_ms, "cold_images": args.cold_images},
+            "routes": routes,
+            "total": total,
+            "upstream_calls": stubs.requests if stubs is not None else None,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if server is not None:
+        server.shutdown()
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, BASE_DIR)
+    main()
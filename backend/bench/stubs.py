@@ -0,0 +1,156 @@
+"""
+Local stand-ins for every upstream the API calls, on one HTTP server.
+
+    CollectAPI   GET  /gasPrice/fromCity
+    MarketCheck  GET  /v2/sales/car
+    ElevenLabs   POST /v1/convai/twilio/outbound-call
+    SerpAPI      GET  /search               (image results point back at /img/...)
+    images       GET  /img/<name>
+    Gemini       POST /v1beta/models/<model>:generateContent
+
+Each upstream gets a latency (fixed + uniform jitter) and an error rate; a
+failed call answers 503. host_overrides() gives the HTTP_HOST_OVERRIDES value
+that routes the real upstream hosts here.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+UPSTREAMS = ("gas", "marketcheck", "elevenlabs", "serp", "image", "gemini")
+
+# Hosts reached through http_client; Gemini goes through its SDK (GEMINI_API_ENDPOINT)
+STUBBED_HOSTS = ("api.collectapi.com", "api.marketcheck.com", "api.elevenlabs.io", "serpapi.com")
+
+# A 1x1 JPEG, enough to pass the image download's content-type check
+TINY_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f141d1a1f1e1d1a"
+    "1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b080001000101011100ffc4001f000001050101010101"
+    "0100000000000000000102030405060708090a0bffc400b5100002010303020403050504040000017d01020300041105122131410613516107"
+    "227114328191a1082342b1c11552d1f02433627282090a161718191a25262728292a3435363738393a434445464748494a535455565758595a"
+    "636465666768696a737475767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7"
+    "c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9"
+)
+
+
+class UpstreamProfile:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    def wait_and_fail(self):
+        """Sleep the injected latency; True if this call should fail."""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return random.random() < self.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self):
+        path = urlsplit(self.path).path
+        if path == "/gasPrice/fromCity":
+            return "gas", self._gas
+        if path == "/v2/sales/car":
+            return "marketcheck", self._marketcheck
+        if path == "/v1/convai/twilio/outbound-call":
+            return "elevenlabs", self._outbound_call
+        if path == "/search":
+            return "serp", self._serp
+        if path.startswith("/img/"):
+            return "image", self._image
+        if path.endswith(":generateContent"):
+            return "gemini", self._gemini
+        return None, None
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        upstream, handler = self._route()
+        if handler is None:
+            return self._send(404, {"error": "unknown stub path"})
+        stubs = self.server.stubs
+        stubs.count(upstream)
+        if stubs.profiles[upstream].wait_and_fail():
+            return self._send(503, {"error": "injected failure"})
+        handler()
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _gas(self):
+        self._send(200, {"success": True, "result": {
+            "currency": "usd", "gasoline": f"{random.uniform(2.8, 4.2):.3f}", "unit": "gallon"}})
+
+    def _marketcheck(self):
+        mean = random.uniform(12000, 35000)
+        self._send(200, {"num_found": 120, "price_stats": {
+            "mean": round(mean, 2), "median": round(mean * 0.98, 2), "min": round(mean * 0.6, 2), "max": round(mean * 1.4, 2)}})
+
+    def _outbound_call(self):
+        self._send(200, {"success": True, "conversation_id": uuid.uuid4().hex, "callSid": uuid.uuid4().hex})
+
+    def _serp(self):
+        base = self.server.stubs.base_url
+        images = [{"thumbnail": f"{base}/img/{uuid.uuid4().hex}.jpg", "original": f"{base}/img/{uuid.uuid4().hex}.jpg"}
+                  for _ in range(5)]
+        self._send(200, {"images_results": images})
+
+    def _image(self):
+        self._send(200, TINY_JPEG, content_type="image/jpeg")
+
+    def _gemini(self):
+        text = "The Camry Hybrid and Corolla Hybrid are the most efficient picks in this range."
+        self._send(200, {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 400, "candidatesTokenCount": 20, "totalTokenCount": 420},
+        })
+
+
+class StubServer:
+    """Serves all upstream stubs from one port in a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, profiles=None):
+        self.profiles = {name: UpstreamProfile() for name in UPSTREAMS}
+        self.profiles.update(profiles or {})
+        self.requests = {name: 0 for name in UPSTREAMS}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stubs = self
+        self.base_url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="upstream-stubs", daemon=True)
+
+    def count(self, upstream):
+        with self._lock:
+            self.requests[upstream] += 1
+
+    def host_overrides(self):
+        """Value for HTTP_HOST_OVERRIDES sending every real upstream host here."""
+        return ",".join(f"{host}={self.base_url}" for host in STUBBED_HOSTS)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
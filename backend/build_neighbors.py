@@ -0,0 +1,59 @@
+"""
+Precompute the top-K most similar cars for every car.
+
+Similarity is the dot product of the vectors from car_vectors.py (text embedding
+plus normalized specs). The result is written to data/car_neighbors.npz as a
+compact table: hack_ids, an (N, K) int32 array of neighbour row indices sorted
+best first, and the matching float16 scores. similar_cars.py serves it with a
+dict lookup per request. Re-run this after car_vectors.pkl or the CSV changes.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import car_vectors
+
+NEIGHBORS_PATH = os.path.join(car_vectors.BASE_DIR, "data", "car_neighbors.npz")
+
+
+def top_k(matrix, k, block_size=1024):
+    """(indices, scores) of the k highest-scoring other rows for each row, best first."""
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    # Blocks keep the score matrix at block_size x N rather than N x N
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = matrix[start:stop] @ matrix.T
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # not its own neighbour
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        indices[start:stop] = np.take_along_axis(part, order, axis=1)
+        scores[start:stop] = np.take_along_axis(part_scores, order, axis=1)
+    return indices, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the similar-cars neighbour table.")
+    parser.add_argument("-k", type=int, default=20, help="Neighbours kept per car")
+    parser.add_argument("--spec-weight", type=float, default=car_vectors.SPEC_WEIGHT,
+                        help="Share of the score from price/MPG/seats/horsepower (rest is the text embedding)")
+    parser.add_argument("--out", default=NEIGHBORS_PATH, help="Where to write the table")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    hack_ids, matrix = car_vectors.load(spec_weight=args.spec_weight)
+    indices, scores = top_k(matrix, args.k)
+    np.savez_compressed(args.out, hack_ids=np.array(hack_ids), indices=indices,
+                        scores=scores.astype(np.float16))
+    elapsed = time.perf_counter() - start
+    print(f"[NEIGHBORS] {len(hack_ids)} cars x {indices.shape[1]} neighbours -> {args.out} "
+          f"({os.path.getsize(args.out)} bytes, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
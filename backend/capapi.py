@@ -1,58 +1,340 @@
-import dotenv
+"""
+Crawl carapi.app trims, with their body, engine and mileage details, into CSV shards.
+
+Trim pages are fetched concurrently (page 1 of each make says how many there
+are) and each new trim's three detail calls run on a second pool, all through
+http_client's pooled sessions and a shared token bucket so the whole crawl
+stays under --rate requests per second. Trims are deduplicated on hack-id with
+a set, and details are fetched once per submodel.
+
+Rows are appended to <out-dir>/trims-NNNN.csv as they complete, with a new
+shard every --shard-size rows. Progress is journaled to <out-dir>/checkpoint.jsonl
+(finished pages and written trims), so an interrupted crawl picks up where it
+stopped; --restart ignores the journal. Merge the shards with combinecsv.py.
+
+Every API response is also kept in <out-dir>/responses.sqlite for --cache-ttl
+seconds, so a re-crawl only calls carapi for what is new or stale, and
+--offline replays a crawl from that cache without touching the network.
+
+    python3 capapi.py                      # every make
+    python3 capapi.py --makes Toyota,Honda --rate 5
+"""
+import argparse
+import csv
+import glob
+import json
 import os
-import requests
-from google.cloud import firestore
-import pandas as pd
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dotenv
+
+import http_client
+from car_schema import CAR_FIELDS
+from disk_cache import DiskCache, cache_key
 
 dotenv.load_dotenv()
 CAR_TOKEN = os.getenv("CAR-TOKEN")
 CAR_SECRET = os.getenv("CAR-SECRET")
 
-db = firestore.Client()
+BASE_URL = "https://carapi.app"
+DEFAULT_OUT_DIR = os.path.join("data", "crawl")
+DETAIL_KINDS = ("bodies", "engines", "mileages")
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+# Everything in the catalog schema except the columns data-processing-makes.py derives
+CRAWL_FIELDS = [f for f in CAR_FIELDS if f not in ("estimated_current_cost", "expected_value_2027", "img_path")]
+
 
-response = requests.get("https://carapi.app/api/trims/v2?make=Toyota")
-print(response.json())
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of up to `burst`."""
 
-duplicates = []
-data = []
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
-print(response.json()["collection"]["first"])
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
-i = 1
 
-while True:
-        for car in response.json()["data"]:
-                # print(car)
-                print(f'{car["year"]}-{car["model"]}-{car["trim"]}-{car["description"]}')
-                if f'{car["year"]}-{car["model"]}-{car["trim"]}-{car["description"]}' in duplicates:
+class Checkpoint:
+    """
+    Append-only journal of {"page": "<make>:<n>"} and {"trim": hack_id, "submodel": id}
+    lines. A line is only written after its rows are flushed to a shard, and a
+    torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.pages = set()
+        self.trims = set()
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
                         continue
-                else:
-                        duplicates.append(f'{car["year"]}-{car["model"]}-{car["trim"]}-{car["description"]}')
-                        try:
-                                bodies = requests.get(f'https://carapi.app/api/bodies/v2?submodel_id={car["submodel_id"]}')
-                                print(bodies.json()['data'][0])
-                        except KeyError:
-                                print(bodies.json())
-                        try:
-                                engines = requests.get(f'https://carapi.app/api/engines/v2?submodel_id={car["submodel_id"]}')
-                                print(engines.json()['data'][0])
-                        except KeyError:
-                                print(engines.json())
-                        try:
-                                mileages = requests.get(f'https://carapi.app/api/mileages/v2?submodel_id={car["submodel_id"]}')
-                                print(mileages.json()['data'][0])
-                        except KeyError:
-                                print(mileages.json())
-                        combined = {'hack-id': f'{car["year"]}-{car["model"]}-{car["trim"]}-{car["description"]}', **car, **bodies.json()['data'][0], **engines.json()['data'][0], **mileages.json()['data'][0]}
-                        print(combined)
-                        data.append(combined)
-
-        df = pd.DataFrame(data)
-        df.to_csv('toyota_trims_2020_onwards' + str(i) + '.csv', index=False)
-        data = []
-        i += 1
-
-        if response.json()["collection"]["next"] == '':
-                break
-
-        response = requests.get('https://carapi.app' + response.json()["collection"]["next"])
+                    if "page" in entry:
+                        self.pages.add(entry["page"])
+                    if "trim" in entry:
+                        self.trims.add(entry["trim"])
+        self._fh = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def record(self, **entry):
+        with self.lock:
+            self._fh.write(json.dumps(entry) + "\n")
+            self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+class ShardWriter:
+    """CSV shards of at most `shard_size` rows; a resumed crawl starts a new shard."""
+
+    def __init__(self, out_dir, shard_size):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.shard = len(glob.glob(os.path.join(out_dir, "trims-*.csv")))
+        self.rows_in_shard = shard_size
+        self._fh = None
+        self._writer = None
+        self.lock = threading.Lock()
+
+    def write(self, row):
+        with self.lock:
+            if self.rows_in_shard >= self.shard_size:
+                self._rotate()
+            self._writer.writerow(row)
+            self._fh.flush()
+            self.rows_in_shard += 1
+
+    def _rotate(self):
+        if self._fh is not None:
+            self._fh.close()
+        self.shard += 1
+        path = os.path.join(self.out_dir, f"trims-{self.shard:04d}.csv")
+        self._fh = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._fh, fieldnames=CRAWL_FIELDS, extrasaction="ignore")
+        self._writer.writeheader()
+        self.rows_in_shard = 0
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+
+
+def hack_id(car):
+    return f'{car["year"]}-{car["model"]}-{car["trim"]}-{car["description"]}'
+
+
+class Crawler:
+    def __init__(self, out_dir, rate, burst, workers, shard_size, restart=False,
+                 cache_ttl=DEFAULT_CACHE_TTL, offline=False, use_cache=True):
+        os.makedirs(out_dir, exist_ok=True)
+        self.cache = DiskCache(os.path.join(out_dir, "responses.sqlite"), cache_ttl, offline=offline) \
+            if use_cache or offline else None
+        self.offline = offline
+        self.bucket = TokenBucket(rate, burst)
+        self.checkpoint = Checkpoint(os.path.join(out_dir, "checkpoint.jsonl"), restart=restart)
+        if restart:
+            for path in glob.glob(os.path.join(out_dir, "trims-*.csv")):
+                os.remove(path)
+        self.shards = ShardWriter(out_dir, shard_size)
+        self.page_pool = ThreadPoolExecutor(max_workers=max(2, workers // 2), thread_name_prefix="crawl-pages")
+        self.detail_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl-details")
+        self.headers = {"Accept": "application/json"}
+        self.seen = set(self.checkpoint.trims)
+        self.seen_lock = threading.Lock()
+        self.details = {}  # (kind, submodel_id) -> Future, so each submodel is fetched once per run
+        self.details_lock = threading.Lock()
+        self.counts = {"requests": 0, "pages": 0, "written": 0, "duplicates": 0, "incomplete": 0, "errors": 0}
+        self.counts_lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self.counts_lock:
+            self.counts[name] += n
+
+    def login(self):
+        """Trade CAR-TOKEN/CAR-SECRET for a JWT; without them carapi serves its free data set."""
+        if self.offline:
+            return
+        if not (CAR_TOKEN and CAR_SECRET):
+            print("[CRAWL] CAR-TOKEN/CAR-SECRET not set, crawling without authentication")
+            return
+        self.bucket.acquire()
+        resp = http_client.post(f"{BASE_URL}/api/auth/login",
+                                json={"api_token": CAR_TOKEN, "api_secret": CAR_SECRET})
+        resp.raise_for_status()
+        self.headers["Authorization"] = f"Bearer {resp.text.strip()}"
+
+    def _fetch_json(self, path, params):
+        self.bucket.acquire()
+        self._count("requests")
+        resp = http_client.get(BASE_URL + path, params=params, headers=self.headers)
+        resp.raise_for_status()
+        return resp.json()
+
+    def get_json(self, path, params=None):
+        if self.cache is None:
+            return self._fetch_json(path, params)
+        return self.cache.get_or_fetch(cache_key(path, params), lambda: self._fetch_json(path, params))
+
+    def makes(self):
+        names = []
+        path, params = "/api/makes/v2", {}
+        while path:
+            payload = self.get_json(path, params)
+            names.extend(make["name"] for make in payload.get("data", []))
+            path, params = payload.get("collection", {}).get("next") or "", None
+        return names
+
+    def detail(self, kind, submodel_id):
+        """First record of /api/<kind>/v2 for a submodel, {} if there is none."""
+        payload = self.get_json(f"/api/{kind}/v2", {"submodel_id": submodel_id})
+        data = payload.get("data") or []
+        return data[0] if data else {}
+
+    def _detail_future(self, kind, submodel_id):
+        key = (kind, submodel_id)
+        with self.details_lock:
+            future = self.details.get(key)
+            if future is None:
+                future = self.details[key] = self.detail_pool.submit(self.detail, kind, submodel_id)
+        return future
+
+    def process_page(self, make, page, payload):
+        pending = []
+        for car in payload.get("data", []):
+            key = hack_id(car)
+            with self.seen_lock:
+                if key in self.seen:
+                    self._count("duplicates")
+                    continue
+                self.seen.add(key)
+            pending.append((key, car, [self._detail_future(kind, car["submodel_id"]) for kind in DETAIL_KINDS]))
+
+        complete = True
+        for key, car, futures in pending:
+            combined = {"hack-id": key, **car}
+            try:
+                details = [future.result() for future in futures]
+            except Exception as e:
+                # Leave the trim and its page unrecorded so the next run retries them
+                print(f"[CRAWL] details for submodel {car['submodel_id']} failed: {e}")
+                self._count("errors")
+                with self.seen_lock:
+                    self.seen.discard(key)
+                complete = False
+                continue
+            for detail in details:
+                if not detail:
+                    self._count("incomplete")
+                combined.update(detail)
+            combined["hack-id"] = key
+            self.shards.write(combined)
+            self.checkpoint.record(trim=key, submodel=car["submodel_id"])
+            self._count("written")
+
+        if complete:
+            self.checkpoint.record(page=f"{make}:{page}")
+        self._count("pages")
+
+    def trims_page(self, make, page):
+        return self.get_json("/api/trims/v2", {"make": make, "page": page})
+
+    def _page_task(self, make, page, payload=None):
+        try:
+            if payload is None:
+                payload = self.trims_page(make, page)
+            self.process_page(make, page, payload)
+        except Exception as e:
+            print(f"[CRAWL] {make} page {page} failed, it will be retried on the next run: {e}")
+            self._count("errors")
+
+    def run(self, makes):
+        start = time.perf_counter()
+        self.login()
+        try:
+            makes = makes or self.makes()
+        except Exception as e:
+            print(f"[CRAWL] could not list makes: {e!r}")
+            makes = []
+            self._count("errors")
+        print(f"[CRAWL] {len(makes)} makes, resuming with {len(self.checkpoint.pages)} pages "
+              f"and {len(self.seen)} trims already done")
+
+        # Page 1 of each make (fetched even when done) says how many pages it has
+        firsts = {make: self.page_pool.submit(self.trims_page, make, 1) for make in makes}
+        futures = []
+        for make, first_future in firsts.items():
+            try:
+                first = first_future.result()
+            except Exception as e:
+                print(f"[CRAWL] {make} failed, it will be retried on the next run: {e}")
+                self._count("errors")
+                continue
+            pages = int(first.get("collection", {}).get("pages") or 1)
+            for page in range(1, pages + 1):
+                if f"{make}:{page}" not in self.checkpoint.pages:
+                    futures.append(self.page_pool.submit(self._page_task, make, page, first if page == 1 else None))
+        for future in futures:
+            future.result()
+        self.page_pool.shutdown()
+        self.detail_pool.shutdown()
+        self.shards.close()
+        self.checkpoint.close()
+        if self.cache is not None:
+            self.cache.close()
+
+        elapsed = time.perf_counter() - start
+        counts = self.counts
+        print(f"[CRAWL] {counts['written']} trims from {counts['pages']} pages in {elapsed:.1f}s "
+              f"({counts['requests'] / max(elapsed, 1e-9):.1f} req/s), {counts['duplicates']} duplicates, "
+              f"{counts['incomplete']} missing details, {counts['errors']} errors")
+        if self.cache is not None:
+            print(f"[CRAWL] response cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl carapi.app trims into CSV shards.")
+    parser.add_argument("--makes", help="Comma-separated makes (default: every make carapi lists)")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="Where shards and the checkpoint go")
+    parser.add_argument("--rate", type=float, default=10.0, help="Requests per second across all workers")
+    parser.add_argument("--burst", type=int, default=20, help="Requests allowed at once after an idle spell")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent detail requests")
+    parser.add_argument("--shard-size", type=int, default=1000, help="Rows per CSV shard")
+    parser.add_argument("--restart", action="store_true", help="Drop the checkpoint and shards and crawl everything again (the response cache is kept)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL,
+                        help="Seconds a cached API response is reused (default one week)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API and don't cache responses")
+    parser.add_argument("--offline", action="store_true",
+                        help="Only use cached responses, whatever their age; missing ones count as errors")
+    args = parser.parse_args()
+
+    makes = [m.strip() for m in args.makes.split(",") if m.strip()] if args.makes else None
+    crawler = Crawler(args.out_dir, args.rate, args.burst, args.workers, args.shard_size, restart=args.restart,
+                      cache_ttl=args.cache_ttl, offline=args.offline, use_cache=not args.no_cache)
+    counts = crawler.run(makes)
+    raise SystemExit(1 if counts["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import csv
+from collections import namedtuple
+
+INT = "int"
+FLOAT = "float"
+STR = "str"
+
+# required fields must be present (their value may be empty); optional numeric
+# fields that are missing or not parseable are stored as "", like add_car always did
+Field = namedtuple("Field", ["name", "type", "required", "default"], defaults=[False, ""])
+
+CAR_SCHEMA = (
+    Field("hack-id", STR, required=True),
+    Field("id", INT),
+    Field("make_id", INT),
+    Field("model_id", INT),
+    Field("submodel_id", INT),
+    Field("year", INT),
+    Field("make", STR, required=True),
+    Field("model", STR, required=True),
+    Field("series", STR, required=True),
+    Field("submodel", STR, required=True),
+    Field("trim", STR, required=True),
+    Field("description", STR, required=True),
+    Field("msrp", INT),
+    Field("invoice", STR, required=True),
+    Field("created", STR, required=True),
+    Field("modified", STR, required=True),
+    Field("trim_id", INT),
+    Field("trim_description", STR, required=True),
+    Field("type", STR, required=True),
+    Field("doors", INT),
+    Field("length", FLOAT),
+    Field("width", FLOAT),
+    Field("seats", INT),
+    Field("height", FLOAT),
+    Field("wheel_base", FLOAT),
+    Field("front_track", FLOAT),
+    Field("rear_track", FLOAT),
+    Field("ground_clearance", FLOAT),
+    Field("cargo_capacity", FLOAT),
+    Field("max_cargo_capacity", FLOAT),
+    Field("curb_weight", FLOAT),
+    Field("gross_weight", FLOAT),
+    Field("max_payload", FLOAT),
+    Field("max_towing_capacity", FLOAT),
+    Field("engine_type", STR, required=True),
+    Field("fuel_type", STR, required=True),
+    Field("cylinders", STR, required=True),
+    Field("size", FLOAT),
+    Field("horsepower_hp", INT),
+    Field("horsepower_rpm", INT),
+    Field("torque_ft_lbs", FLOAT),
+    Field("torque_rpm", FLOAT),
+    Field("valves", INT),
+    Field("valve_timing", STR, required=True),
+    Field("cam_type", STR, required=True),
+    Field("drive_type", STR, required=True),
+    Field("transmission", STR, required=True),
+    Field("fuel_tank_capacity", FLOAT),
+    Field("combined_mpg", FLOAT),
+    Field("epa_city_mpg", FLOAT),
+    Field("epa_highway_mpg", INT),
+    Field("range_city", INT),
+    Field("range_highway", INT),
+    Field("battery_capacity_electric", INT),
+    Field("epa_time_to_charge_hr_240v_electric", INT),
+    Field("epa_kwh_100_mi_electric", INT),
+    Field("range_electric", INT),
+    Field("epa_highway_mpg_electric", INT),
+    Field("epa_city_mpg_electric", INT),
+    Field("epa_combined_mpg_electric", INT),
+    Field("estimated_current_cost", FLOAT),
+    Field("expected_value_2027", FLOAT),
+    Field("img_path", STR),
+)
+
+CAR_FIELDS = [field.name for field in CAR_SCHEMA]
+
+_CONVERTERS = {INT: int, FLOAT: float, STR: None}
+_MISSING = object()
+
+
+def compile_coercer(schema):
+    """
+    Build a coerce(data) function for a schema.
+
+    coerce(data) returns (doc, errors). errors maps field name to a message for
+    every missing required field and every non-empty value that failed to convert.
+    doc is None if a required field is missing, otherwise a dict with every
+    schema field (unparseable numbers replaced by the field default).
+    """
+    steps = tuple((f.name, _CONVERTERS[f.type], f.type, f.required, f.default) for f in schema)
+
+    def coerce(data):
+        doc = {}
+        errors = {}
+        get = data.get
+        missing_required = False
+        for name, convert, type_name, required, default in steps:
+            value = get(name, _MISSING)
+            if value is _MISSING:
+                if required:
+                    errors[name] = "missing"
+                    missing_required = True
+                else:
+                    doc[name] = default
+                continue
+            if convert is None:
+                doc[name] = value
+                continue
+            try:
+                doc[name] = convert(value)
+            except (TypeError, ValueError):
+                doc[name] = default
+                if value != "" and value is not None:
+                    errors[name] = f"invalid {type_name}: {value!r}"
+        return (None if missing_required else doc), errors
+
+    return coerce
+
+
+coerce_car = compile_coercer(CAR_SCHEMA)
+
+
+def read_car_csv(path):
+    """Yield (line number, doc, errors) for each non-empty row of a catalog CSV."""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.DictReader(fh)
+        for i, row in enumerate(reader, start=1):
+            if not any(v.strip() if isinstance(v, str) else v for v in row.values()):
+                continue
+            doc, errors = coerce_car(row)
+            yield i, doc, errors
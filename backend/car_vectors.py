@@ -0,0 +1,63 @@
+"""
+One unit-length vector per car, for similarity and recommendation scoring.
+
+Each row joins the car's MiniLM text embedding from data/car_vectors.pkl (the
+same vectors rag_model.py loads into Chroma) with its z-scored specs: log price,
+combined MPG, seats and horsepower. Both halves are scaled to unit length and
+weighted before the row is normalized, so a dot product between two rows is
+(1 - SPEC_WEIGHT) * text similarity + SPEC_WEIGHT * spec similarity.
+
+car_data_processed.csv repeats some hack-ids; only the first row of each is kept.
+"""
+import logging
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VECTORS_PATH = os.path.join(BASE_DIR, "data", "car_vectors.pkl")
+CARS_CSV_PATH = os.path.join(BASE_DIR, "data", "car_data_processed.csv")
+
+SPEC_WEIGHT = float(os.getenv("CAR_VECTOR_SPEC_WEIGHT", "0.35"))
+SPEC_COLUMNS = ("estimated_current_cost", "combined_mpg", "seats", "horsepower_hp")
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def spec_matrix(df):
+    """z-scored SPEC_COLUMNS, with price on a log scale so a $5k gap matters more on a cheap car."""
+    specs = df[list(SPEC_COLUMNS)].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+    specs["estimated_current_cost"] = np.log1p(specs["estimated_current_cost"].clip(lower=0))
+    specs = specs.fillna(specs.median())
+    std = specs.std(ddof=0).replace(0, 1)
+    return ((specs - specs.mean()) / std).to_numpy()
+
+
+def combine(embeddings, specs, spec_weight=SPEC_WEIGHT):
+    text = _unit_rows(np.asarray(embeddings, dtype=np.float64)) * np.sqrt(1 - spec_weight)
+    spec = _unit_rows(specs) * np.sqrt(spec_weight)
+    return _unit_rows(np.hstack([text, spec])).astype(np.float32)
+
+
+def load(spec_weight=SPEC_WEIGHT, vectors_path=VECTORS_PATH, cars_csv_path=CARS_CSV_PATH):
+    """
+    Returns (hack_ids, matrix) with matrix[i] the vector for hack_ids[i].
+    """
+    with open(vectors_path, "rb") as f:
+        data = pickle.load(f)
+    df = pd.read_csv(cars_csv_path)
+    if df["hack-id"].tolist() != list(data["hack_ids"]):
+        raise ValueError(f"{vectors_path} is out of date with {cars_csv_path}; delete it and let rag_model.py rebuild it")
+
+    keep = ~df["hack-id"].duplicated().to_numpy()
+    hack_ids = df["hack-id"][keep].tolist()
+    matrix = combine(np.asarray(data["embeddings"])[keep], spec_matrix(df[keep]), spec_weight)
+    log.info("car vectors loaded", extra={"cars": len(hack_ids), "dims": matrix.shape[1]})
+    return hack_ids, matrix
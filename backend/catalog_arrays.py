@@ -0,0 +1,111 @@
+"""
+Column arrays over the whole cars collection, for endpoints that rank or compare
+every car at once.
+
+The collection is read once per catalog version (see catalog_version.py) into a
+float array per numeric field, with NaN where a car has no value, and a list per
+text field. Requests then work on those arrays without touching Firestore.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+import catalog_version
+import metrics
+from car_schema import CAR_SCHEMA, FLOAT, INT
+from database import get_db
+from ttl_cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+NUMERIC_FIELDS = [f.name for f in CAR_SCHEMA if f.type in (INT, FLOAT)]
+TEXT_FIELDS = [f.name for f in CAR_SCHEMA if f.name not in NUMERIC_FIELDS and f.name != "hack-id"]
+
+# Versions already change on every write; the TTL only bounds how long a
+# snapshot lives if the version doc is edited by hand
+CATALOG_SNAPSHOT_TTL = int(os.getenv("CATALOG_SNAPSHOT_TTL", "3600"))
+_snapshots = TTLCache(ttl=CATALOG_SNAPSHOT_TTL, max_size=2, name="catalog-snapshot")
+_derive_lock = threading.Lock()
+
+
+class Snapshot:
+    def __init__(self, version, hack_ids, numbers, text):
+        self.version = version
+        self.hack_ids = hack_ids
+        self.index = {h: i for i, h in enumerate(hack_ids)}
+        self.numbers = numbers  # field -> float array, NaN where missing
+        self.text = text  # field -> list of str
+        self.derived = {}  # per-snapshot caches for callers, e.g. sorted columns
+
+    def __len__(self):
+        return len(self.hack_ids)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _load(version):
+    with metrics.span("firestore", "cars.snapshot"):
+        docs = list(get_db().collection("cars").stream())
+    hack_ids = [doc.id for doc in docs]
+    rows = [doc.to_dict() for doc in docs]
+    numbers = {name: np.array([_number(row.get(name)) for row in rows], dtype=np.float64)
+               for name in NUMERIC_FIELDS}
+    text = {name: [str(row.get(name) or "") for row in rows] for name in TEXT_FIELDS}
+    log.info("catalog snapshot loaded", extra={"cars": len(hack_ids), "version": version})
+    return Snapshot(version, hack_ids, numbers, text)
+
+
+def snapshot():
+    """The Snapshot for the current catalog version, loading it on first use."""
+    version = catalog_version.get_version()
+    return _snapshots.get_or_fetch(version, lambda: _load(version))
+
+
+def derived(snap, key, build):
+    """build(snap), computed once per snapshot and kept on it under `key`."""
+    value = snap.derived.get(key)
+    if value is None:
+        with _derive_lock:
+            value = snap.derived.get(key)
+            if value is None:
+                value = snap.derived[key] = build(snap)
+    return value
+
+
+def _sorted_columns(snap):
+    types = np.array(snap.text["type"], dtype=object)
+    segments = {t: types == t for t in set(snap.text["type"])}
+    columns = {}
+    for name, values in snap.numbers.items():
+        present = np.isfinite(values)
+        columns[name] = (np.sort(values[present]),
+                         {t: np.sort(values[present & mask]) for t, mask in segments.items()})
+    return columns
+
+
+def sorted_columns(snap):
+    """
+    {field: (sorted values, {type: sorted values})} for every numeric field,
+    leaving out missing values. Built once per snapshot.
+    """
+    return derived(snap, "sorted", _sorted_columns)
+
+
+def percentile(sorted_values, value):
+    """Mid-rank percentile (0-100) of `value` among `sorted_values`; None if either is empty."""
+    if not len(sorted_values) or value is None or not np.isfinite(value):
+        return None
+    below = np.searchsorted(sorted_values, value, side="left")
+    at_or_below = np.searchsorted(sorted_values, value, side="right")
+    return round(float((below + at_or_below) / 2 / len(sorted_values) * 100), 1)
+
+
+def stats():
+    return _snapshots.stats()
@@ -0,0 +1,34 @@
+"""
+Version stamp for the cars collection, used for ETags and per-version caches.
+
+The version lives in Firestore at meta/catalog so every worker sees writes made
+by the others; each process re-reads it at most every CATALOG_VERSION_TTL
+seconds. Anything that writes to `cars` calls bump() afterwards.
+"""
+import os
+import uuid
+
+from database import get_db
+from ttl_cache import TTLCache
+
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "5"))
+
+_cache = TTLCache(ttl=CATALOG_VERSION_TTL, max_size=1, name="catalog-version")
+_KEY = "version"
+
+
+def _read():
+    doc = get_db().collection("meta").document("catalog").get()
+    return (doc.to_dict() or {}).get("version", "0") if doc.exists else "0"
+
+
+def get_version():
+    return _cache.get_or_fetch(_KEY, _read)
+
+
+def bump():
+    """Record that the catalog changed. Returns the new version."""
+    version = uuid.uuid4().hex
+    get_db().collection("meta").document("catalog").set({"version": version})
+    _cache.set(_KEY, version)
+    return version
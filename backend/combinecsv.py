@@ -1,13 +1,25 @@
+import argparse
+import glob
+
 import pandas as pd
 
-# Combine CSV files xxx1.csv to xxx12.csv
 name = 'toyota_trims_2020_onwards'
+
+parser = argparse.ArgumentParser(description="Combine CSV files into one.")
+parser.add_argument("pattern", nargs="?", help="Glob of files to combine, e.g. 'data/crawl/trims-*.csv' from capapi.py")
+parser.add_argument("--out", "-o", default=f'{name}.csv', help="Combined CSV to write")
+args = parser.parse_args()
+
+# Combine CSV files xxx1.csv to xxx12.csv, or whatever the pattern matches
+files = sorted(glob.glob(args.pattern)) if args.pattern else [f'{name}{i}.csv' for i in range(1, 3)]
 combined = pd.concat(
-    [pd.read_csv(f'{name}{i}.csv') for i in range(1, 3)],
+    [pd.read_csv(f) for f in files],
     ignore_index=True
 )
+if 'hack-id' in combined.columns:
+    combined = combined.drop_duplicates('hack-id')
 
 # Save combined file
-combined.to_csv(f'{name}.csv', index=False)
+combined.to_csv(args.out, index=False)
 
-print(f'✅ Combined CSV saved as {name}.csv')
\ No newline at end of file
+print(f'✅ Combined CSV saved as {args.out}')
@@ -0,0 +1,41 @@
+import os
+import threading
+
+from google.cloud import firestore
+
+FIRESTORE_PROJECT = os.getenv("FIRESTORE_PROJECT", "hackutd2025-477718")
+FIRESTORE_DATABASE = os.getenv("FIRESTORE_DATABASE", "hackutd25")
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    """
+    The process-wide Firestore client, created on first use.
+
+    Created lazily (and dropped in forked children) because gRPC channels can't be
+    shared across fork, so with a preloaded multi-worker server each worker opens
+    its own client after it starts.
+    """
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = firestore.Client(project=FIRESTORE_PROJECT, database=FIRESTORE_DATABASE)
+    return _db
+
+
+def set_db(client):
+    """Use `client` instead of a real Firestore client (benchmarks use an in-memory fake)."""
+    global _db
+    _db = client
+
+
+def _reset_after_fork():
+    global _db, _db_lock
+    _db = None
+    _db_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from google.cloud import firestore
+
+import http_client
+import metrics
+from database import get_db
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+ELEVEN_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+ELE_AGENT_ID = os.getenv("ELE_AGENT_ID")  # ElevenLabs agent id
+ELE_AGENT_PHONE_NUMBER_ID = os.getenv("ELE_AGENT_PHONE_NUMBER_ID")  # phone number configured in ElevenLabs/Twilio
+OUTBOUND_CALL_URL = "https://api.elevenlabs.io/v1/convai/twilio/outbound-call"
+
+DEALER_CALL_WORKERS = int(os.getenv("DEALER_CALL_WORKERS", "4"))
+DEALER_CALL_MAX_PENDING = int(os.getenv("DEALER_CALL_MAX_PENDING", "100"))
+# Minimum seconds between two calls placed to the same number
+DEALER_CALL_MIN_INTERVAL = float(os.getenv("DEALER_CALL_MIN_INTERVAL", "60"))
+# Requests without an Idempotency-Key that hit the same number within this window are the same job
+DEALER_CALL_DEDUP_WINDOW = float(os.getenv("DEALER_CALL_DEDUP_WINDOW", "30"))
+DEALER_CALL_JOB_TTL = float(os.getenv("DEALER_CALL_JOB_TTL", "86400"))
+
+# With several server workers a status poll or a retried POST can land on a
+# different process than the one running the job, so jobs, idempotency keys and
+# each number's last call time are also kept in Firestore, and a job is admitted
+# in one transaction across all three. Set DEALER_CALL_STORE=memory to skip that.
+DEALER_CALL_STORE = os.getenv("DEALER_CALL_STORE", "firestore")
+JOBS_COLLECTION = "dealer_call_jobs"
+IDEMPOTENCY_COLLECTION = "dealer_call_idempotency"
+NUMBERS_COLLECTION = "dealer_call_numbers"
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_executor = ThreadPoolExecutor(max_workers=DEALER_CALL_WORKERS, thread_name_prefix="dealer-call")
+_lock = threading.Lock()
+_jobs = {}             # job_id -> job dict
+_idempotency = {}      # idempotency key -> job_id
+_last_call_at = {}     # phone number -> time.time() the last job for it was accepted
+_pending = 0
+
+
+class QueueFull(Exception):
+    pass
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Number was called recently, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DuplicateRequest(Exception):
+    """The idempotency key is taken, but the job that owns it can't be read."""
+
+
+def _check_interval(last, now):
+    if last is not None and now - last < DEALER_CALL_MIN_INTERVAL:
+        raise RateLimited(DEALER_CALL_MIN_INTERVAL - (now - last))
+
+
+def _default_idempotency_key(phone_number):
+    # Double-clicks land in the same window bucket and collapse into one job
+    bucket = int(time.time() // DEALER_CALL_DEDUP_WINDOW)
+    return hashlib.sha256(f"{phone_number}|{bucket}".encode()).hexdigest()
+
+
+def _prune(now):
+    expired = [job_id for job_id, job in _jobs.items()
+               if job["status"] in (SUCCEEDED, FAILED) and now - job["updated_at"] > DEALER_CALL_JOB_TTL]
+    for job_id in expired:
+        job = _jobs.pop(job_id)
+        _idempotency.pop(job["idempotency_key"], None)
+
+
+def _persist(job):
+    if DEALER_CALL_STORE != "firestore":
+        return
+    try:
+        with metrics.span("firestore", "dealer_call_jobs.set"):
+            get_db().collection(JOBS_COLLECTION).document(job["job_id"]).set(job)
+    except Exception as e:
+        log.warning("could not persist job", extra={"job_id": job["job_id"], "error": str(e)})
+
+
+def _load_persisted(job_id):
+    if DEALER_CALL_STORE != "firestore":
+        return None
+    try:
+        with metrics.span("firestore", "dealer_call_jobs.get"):
+            doc = get_db().collection(JOBS_COLLECTION).document(job_id).get()
+    except Exception as e:
+        log.warning("could not load job", extra={"job_id": job_id, "error": str(e)})
+        return None
+    return doc.to_dict() if doc.exists else None
+
+
+def _number_doc_id(phone_number):
+    return hashlib.sha256(str(phone_number).encode()).hexdigest()
+
+
+def _admit_shared(key, job):
+    """
+    Admit `job` across workers in one Firestore transaction: if `key` is already
+    claimed, return the job id that owns it; otherwise check the number's last
+    call time and write the job, the key claim and the new last call time
+    together, returning the job's own id. Raises RateLimited.
+    """
+    db = get_db()
+    key_ref = db.collection(IDEMPOTENCY_COLLECTION).document(key)
+    number_ref = db.collection(NUMBERS_COLLECTION).document(_number_doc_id(job["to_number"]))
+    job_ref = db.collection(JOBS_COLLECTION).document(job["job_id"])
+    now = job["created_at"]
+
+    @firestore.transactional
+    def admit(transaction):
+        claim = key_ref.get(transaction=transaction)
+        if claim.exists:
+            return (claim.to_dict() or {}).get("job_id")
+        number = number_ref.get(transaction=transaction)
+        _check_interval((number.to_dict() or {}).get("last_call_at") if number.exists else None, now)
+        transaction.set(job_ref, job)
+        transaction.set(key_ref, {"job_id": job["job_id"], "created_at": now})
+        transaction.set(number_ref, {"last_call_at": now})
+        return job["job_id"]
+
+    try:
+        with metrics.span("firestore", "dealer_call_jobs.admit"):
+            return admit(db.transaction())
+    except RateLimited:
+        raise
+    except Exception as e:
+        # Store unavailable: fall back to this worker's own checks
+        log.warning("could not admit job in store", extra={"job_id": job["job_id"], "error": str(e)})
+        with _lock:
+            _check_interval(_last_call_at.get(job["to_number"]), now)
+        return job["job_id"]
+
+
+def _accept(job):
+    """Track an admitted job in this worker; called with _lock held."""
+    _jobs[job["job_id"]] = job
+    _idempotency[job["idempotency_key"]] = job["job_id"]
+    _last_call_at[job["to_number"]] = job["created_at"]
+
+
+def _release_slot():
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def submit_call(phone_number, idempotency_key=None):
+    """
+    Queue an outbound dealer call and return (job, created).
+
+    A repeated idempotency key returns the existing job with created=False.
+    Raises RateLimited if the number was called less than DEALER_CALL_MIN_INTERVAL
+    seconds ago, QueueFull when DEALER_CALL_MAX_PENDING jobs are waiting, and
+    DuplicateRequest if the key is claimed by a job that can't be read.
+    Nothing is recorded for a rejected request.
+    """
+    global _pending
+    key = idempotency_key or _default_idempotency_key(phone_number)
+    now = time.time()
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "status": QUEUED,
+        "to_number": phone_number,
+        "idempotency_key": key,
+        "created_at": now,
+        "updated_at": now,
+        "result": None,
+        "error": None,
+    }
+    shared = DEALER_CALL_STORE == "firestore"
+    with _lock:
+        _prune(now)
+        existing = _idempotency.get(key)
+        if existing is not None and existing in _jobs:
+            return dict(_jobs[existing]), False
+        if _pending >= DEALER_CALL_MAX_PENDING:
+            raise QueueFull("Too many dealer calls waiting")
+        if not shared:
+            _check_interval(_last_call_at.get(phone_number), now)
+            _accept(job)
+        # Held while the shared store decides, released if it turns the job down
+        _pending += 1
+
+    if shared:
+        try:
+            owner = _admit_shared(key, job)
+        except BaseException:
+            _release_slot()
+            raise
+        if owner != job_id:
+            _release_slot()
+            other = get_job(owner) if owner else None
+            if other is None:
+                raise DuplicateRequest("Call already requested, its job is not available yet")
+            return other, False
+        with _lock:
+            _accept(job)
+
+    _executor.submit(_run, job_id)
+    return dict(job), True
+
+
+def get_job(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+    return _load_persisted(job_id)
+
+
+def stats():
+    with _lock:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in _jobs.values():
+            counts[job["status"]] += 1
+        return {"jobs": counts, "pending": _pending, "workers": DEALER_CALL_WORKERS}
+
+
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields, updated_at=time.time())
+        job = dict(_jobs[job_id])
+    _persist(job)
+
+
+def _run(job_id):
+    global _pending
+    with _lock:
+        phone_number = _jobs[job_id]["to_number"]
+    _update(job_id, status=RUNNING)
+
+    payload = {
+        "agent_id": ELE_AGENT_ID,
+        "agent_phone_number_id": ELE_AGENT_PHONE_NUMBER_ID,
+        "to_number": phone_number,
+        # optional: "call_params": {"first_name": "Alice", "lead_id": "1234"}  # pass custom variables to agent
+    }
+    headers = {
+        "xi-api-key": ELEVEN_API_KEY,
+        "Content-Type": "application/json"
+    }
+
+    try:
+        resp = http_client.post(OUTBOUND_CALL_URL, headers=headers, json=payload, timeout=(3.05, 30))
+        if not resp.ok:
+            log.error("dealer call failed", extra={"job_id": job_id, "status": resp.status_code, "body": resp.text[:500]})
+            _update(job_id, status=FAILED, error=f"HTTP {resp.status_code}")
+        else:
+            log.info("dealer call placed", extra={"job_id": job_id})
+            _update(job_id, status=SUCCEEDED, result=resp.json())
+    except Exception as e:
+        log.error("dealer call failed", extra={"job_id": job_id, "error": str(e)})
+        _update(job_id, status=FAILED, error=str(e))
+    finally:
+        with _lock:
+            _pending -= 1
@@ -0,0 +1,68 @@
+"""
+Persistent cache of JSON API responses, in one SQLite file.
+
+Entries are keyed by endpoint path plus sorted query parameters and are fresh
+for `ttl` seconds. In offline mode the age is ignored and a miss raises
+CacheMiss instead of letting the caller go to the network, so a crawl can be
+replayed entirely from an earlier run.
+"""
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+
+class CacheMiss(LookupError):
+    pass
+
+
+def cache_key(path, params=None):
+    return f"{path}?{urlencode(sorted((params or {}).items()))}"
+
+
+class DiskCache:
+    def __init__(self, path, ttl, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body TEXT, fetched_at REAL)")
+        self._db.commit()
+
+    def get(self, key):
+        """The cached payload for `key`, or None if it is missing or expired (raises CacheMiss offline)."""
+        with self.lock:
+            row = self._db.execute("SELECT body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+            fresh = row is not None and (self.offline or time.time() - row[1] < self.ttl)
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if fresh:
+            return json.loads(row[0])
+        if self.offline:
+            raise CacheMiss(key)
+        return None
+
+    def set(self, key, payload):
+        body = json.dumps(payload)
+        with self.lock:
+            self._db.execute("INSERT OR REPLACE INTO responses (key, body, fetched_at) VALUES (?, ?, ?)",
+                             (key, body, time.time()))
+            self._db.commit()
+
+    def get_or_fetch(self, key, fetch):
+        payload = self.get(key)
+        if payload is None:
+            payload = fetch()
+            self.set(key, payload)
+        return payload
+
+    def close(self):
+        with self.lock:
+            self._db.close()
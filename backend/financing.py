@@ -0,0 +1,138 @@
+import numpy as np
+
+# Defaults used by /finance/grid when the caller doesn't pass its own grid
+DEFAULT_TERMS_YEARS = [3, 4, 5, 6, 7]
+DEFAULT_APRS = [2.9, 3.9, 4.9, 5.9, 6.9, 7.9, 8.9, 9.9, 11.9, 13.9]
+
+def _payment_factor(monthly_rate, n_months):
+    """
+    Closed-form annuity factor r / (1 - (1 + r)^-n), with the r -> 0 limit 1/n.
+    Inputs broadcast against each other.
+    """
+    monthly_rate = np.asarray(monthly_rate, dtype=float)
+    n_months = np.asarray(n_months, dtype=float)
+    safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)
+    factor = safe_rate / -np.expm1(-n_months * np.log1p(safe_rate))
+    return np.where(monthly_rate == 0, 1.0 / n_months, factor)
+
+def financing_grid(prices, terms_years=None, aprs=None, down_payment=0.0):
+    """
+    Compute monthly payment, total interest and total paid for every car x term x APR.
+
+    Args:
+        prices: Car prices, shape (cars,)
+        terms_years: Loan terms in years, shape (terms,)
+        aprs: Annual percentage rates in percent (e.g. 6.9), shape (rates,)
+        down_payment: Cash down, subtracted from every price (never below 0 financed)
+
+    Returns:
+        dict of float arrays with shape (cars, terms, rates):
+        principal, monthly_payment, total_interest, total_paid
+    """
+    prices = np.asarray(prices, dtype=float)
+    terms_years = np.asarray(DEFAULT_TERMS_YEARS if terms_years is None else terms_years, dtype=float)
+    aprs = np.asarray(DEFAULT_APRS if aprs is None else aprs, dtype=float)
+
+    principal = np.maximum(prices - down_payment, 0.0)[:, None, None]
+    n_months = (terms_years * 12)[None, :, None]
+    monthly_rate = (aprs / 100 / 12)[None, None, :]
+
+    monthly_payment = principal * _payment_factor(monthly_rate, n_months)
+    total_paid = monthly_payment * n_months
+    total_interest = total_paid - principal
+
+    shape = (len(prices), len(terms_years), len(aprs))
+    return {
+        "principal": np.broadcast_to(principal, shape),
+        "monthly_payment": monthly_payment,
+        "total_interest": total_interest,
+        "total_paid": total_paid,
+    }
+
+def max_affordable_price(monthly_budget, terms_years=None, aprs=None, down_payment=0.0):
+    """
+    Highest car price whose loan fits a monthly budget, for each term x APR.
+
+    Returns:
+        float array with shape (terms, rates)
+    """
+    terms_years = np.asarray(DEFAULT_TERMS_YEARS if terms_years is None else terms_years, dtype=float)
+    aprs = np.asarray(DEFAULT_APRS if aprs is None else aprs, dtype=float)
+    n_months = (terms_years * 12)[:, None]
+    monthly_rate = (aprs / 100 / 12)[None, :]
+    return float(monthly_budget) / _payment_factor(monthly_rate, n_months) + down_payment
+
+def attach_approval(prices, terms_years, income_annum, cibil_score, education, self_employed):
+    """
+    Approval probability for each car x term from the loan model.
+    The model doesn't see the APR, so this is shape (cars, terms).
+    """
+    from predict_loan import predict_approval_probabilities
+
+    prices = np.asarray(prices, dtype=float)
+    terms_years = np.asarray(terms_years, dtype=float)
+    loan_amounts = np.repeat(prices, len(terms_years))
+    loan_terms = np.tile(terms_years, len(prices))
+    proba = predict_approval_probabilities(
+        income_annum=income_annum,
+        loan_amounts=loan_amounts,
+        loan_terms=loan_terms,
+        cibil_score=cibil_score,
+        education=education,
+        self_employed=self_employed
+    )
+    return proba.reshape(len(prices), len(terms_years))
+
+# estimated_current_cost and expected_value_2027 were estimated in this year, so
+# the catalog's depreciation curve spans 2027 - VALUE_BASE_YEAR years
+VALUE_BASE_YEAR = 2025
+VALUE_TARGET_YEAR = 2027
+
+def ownership_costs(current_value, value_2027, combined_mpg, kwh_per_100mi, range_electric,
+                    miles_per_week, years, gas_price, electricity_price):
+    """
+    Total cost of ownership over `years` for every car, as fuel/charging plus
+    depreciation. Per-car inputs are arrays of shape (cars,) with NaN where the
+    catalog has no value.
+
+    - Cars with an electric rating and no MPG are treated as EVs.
+    - Cars with both drive the first range_electric miles of each day on
+      electricity (a plug-in hybrid charged nightly).
+    - Each car loses value at the constant yearly rate implied by
+      current_value -> value_2027.
+
+    Returns:
+        dict of float arrays with shape (cars,): energy_cost, depreciation,
+        total_cost, cost_per_mile. Cars that can't be costed are NaN.
+    """
+    current_value = np.asarray(current_value, dtype=float)
+    value_2027 = np.asarray(value_2027, dtype=float)
+    mpg = np.asarray(combined_mpg, dtype=float)
+    kwh = np.asarray(kwh_per_100mi, dtype=float)
+    range_electric = np.asarray(range_electric, dtype=float)
+
+    miles = miles_per_week * 52 * years
+    daily_miles = miles_per_week / 7
+    has_gas = mpg > 0
+    has_electric = kwh > 0
+    electric_share = np.where(
+        has_electric & ~has_gas, 1.0,
+        np.where(has_electric & (range_electric > 0),
+                 np.minimum(range_electric / daily_miles, 1.0) if daily_miles > 0 else 1.0, 0.0)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gas_cost = np.where(has_gas, miles * (1 - electric_share) / mpg * gas_price, 0.0)
+        electric_cost = np.where(has_electric, miles * electric_share * kwh / 100 * electricity_price, 0.0)
+        energy_cost = np.where(has_gas | has_electric, gas_cost + electric_cost, np.nan)
+
+        yearly_retention = (value_2027 / current_value) ** (1 / (VALUE_TARGET_YEAR - VALUE_BASE_YEAR))
+        depreciation = current_value * (1 - yearly_retention ** years)
+        total_cost = energy_cost + depreciation
+        cost_per_mile = total_cost / miles if miles > 0 else np.full_like(total_cost, np.nan)
+
+    return {
+        "energy_cost": energy_cost,
+        "depreciation": depreciation,
+        "total_cost": total_cost,
+        "cost_per_mile": cost_per_mile,
+    }
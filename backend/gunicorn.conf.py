@@ -0,0 +1,32 @@
+# Production profile for the unified API: gunicorn -c gunicorn.conf.py "app:create_app()"
+import gc
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+# Both legacy ports, so the frontend keeps working unchanged
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000,0.0.0.0:5001").split(",")
+
+# Requests mostly wait on Firestore and upstream APIs, so a few processes with
+# threads each go further than many single-threaded processes
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Import the app (models, embeddings, catalog data) once in the master and fork
+# workers from it. Firestore clients are opened per worker after the fork.
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the GC's tracked generations; otherwise
+    # the first collection in each worker touches every object and un-shares the pages
+    gc.freeze()
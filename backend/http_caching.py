@@ -0,0 +1,77 @@
+"""
+Response compression and ETag helpers.
+
+install(app) compresses JSON and text responses over COMPRESS_MIN_BYTES with
+brotli (when the `brotli` package is installed and the client accepts `br`) or
+gzip. A compressed response's ETag gets an encoding suffix ("<tag>-gzip"), as
+the bytes differ, and etag_matches() ignores that suffix when comparing.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def etag_matches(if_none_match, etag):
+    """True if the If-None-Match header value names `etag` (any encoding variant)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in ENCODING_SUFFIXES:
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)]
+        if tag == etag:
+            return True
+    return False
+
+
+def _choose_encoding(accept_encoding):
+    accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def install(app):
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = _choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_BYTES:
+            return response
+
+        if encoding == "br":
+            body = brotli.compress(body, quality=COMPRESS_LEVEL)
+        else:
+            body = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -0,0 +1,372 @@
+"""
+Shared outbound HTTP client.
+
+One pooled requests.Session per host, so repeated calls to ElevenLabs,
+CollectAPI, MarketCheck, SerpAPI and carapi.app reuse keep-alive connections
+instead of paying a TCP+TLS handshake each time. Every call gets a default
+connect/read timeout, idempotent methods are retried with jittered exponential
+backoff, and per-host latency and error counts are kept for host_stats().
+
+Each host also has a circuit breaker: after HTTP_BREAKER_FAILURES consecutive
+failures calls fail fast with CircuitOpenError for HTTP_BREAKER_RESET seconds,
+then a single probe decides whether to close it again. Idempotent calls made
+with hedge=True send a second copy once the first has run longer than the
+host's observed p95, and use whichever answers first.
+
+Per-host state is bounded: after HTTP_MAX_HOSTS hosts, new ones share one
+LRU-pooled session and are counted (and labelled in metrics) as "other", with
+no breaker. Calls made with pooled=False, like image downloads from arbitrary
+scraped URLs, use a throwaway session and always count as "other".
+
+HTTP_HOST_OVERRIDES ("api.collectapi.com=http://127.0.0.1:9100,...") sends a
+host's calls to another base URL, which is how the benchmark suite points every
+upstream at its local stub server. Stats stay keyed by the original host.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.2"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "2.0"))
+
+HTTP_BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+HTTP_BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", "30"))
+HTTP_HEDGE = os.getenv("HTTP_HEDGE", "1") == "1"
+HTTP_HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", "20"))
+HTTP_MAX_HOSTS = int(os.getenv("HTTP_MAX_HOSTS", "32"))
+HTTP_HOST_OVERRIDES = dict(
+    (host.strip().lower(), base.strip().rstrip("/"))
+    for host, base in (pair.split("=", 1) for pair in os.getenv("HTTP_HOST_OVERRIDES", "").split(",") if "=" in pair)
+)
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Stats/metrics bucket for hosts past HTTP_MAX_HOSTS and unpooled calls
+OTHER_HOST = "other"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_overflow_session = None
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="http-hedge")
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed/open."""
+
+    def __init__(self, failure_threshold=HTTP_BREAKER_FAILURES, reset_timeout=HTTP_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, failed):
+        with self.lock:
+            self._probing = False
+            if not failed:
+                self.state = "closed"
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            snap = {"state": self.state, "consecutive_failures": self.failures,
+                    "times_opened": self.times_opened, "rejected": self.rejected}
+            if self.state == "open":
+                snap["retry_in_s"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return snap
+
+
+class _HostStats:
+    def __init__(self, host, breaker=True):
+        self.host = host
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.statuses = {}
+        # Unrelated hosts lumped together shouldn't trip one shared breaker
+        self.breaker = CircuitBreaker() if breaker else None
+        self.latencies = deque(maxlen=1024)  # seconds, most recent calls
+        self.lock = threading.Lock()
+
+    def record(self, latency, status=None, error=False):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if error:
+                self.errors += 1
+            if status is not None:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            snap = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            }
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            snap.update({"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+                         "p99_ms": round(float(p99), 2), "max_ms": round(float(latencies.max()), 2)})
+        if self.breaker is not None:
+            snap["breaker"] = self.breaker.snapshot()
+        return snap
+
+    def percentile(self, q, min_samples=1):
+        with self.lock:
+            if len(self.latencies) < max(min_samples, 1):
+                return None
+            return float(np.percentile(np.array(self.latencies), q))
+
+
+_stats = {}
+
+
+def _host(url):
+    return urlsplit(url).netloc.lower()
+
+
+def _other_stats():
+    stats = _stats.get(OTHER_HOST)
+    if stats is None:
+        with _sessions_lock:
+            stats = _stats.setdefault(OTHER_HOST, _HostStats(OTHER_HOST, breaker=False))
+    return stats
+
+
+def _host_stats(host):
+    stats = _stats.get(host)
+    if stats is None:
+        with _sessions_lock:
+            stats = _stats.get(host)
+            if stats is None and len(_stats) < HTTP_MAX_HOSTS:
+                stats = _stats[host] = _HostStats(host)
+        if stats is None:
+            stats = _other_stats()
+    return stats
+
+
+def _new_session(pool_connections):
+    session = requests.Session()
+    # Retries are done in request() so they can be jittered and counted
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(url):
+    """Pooled session for the host of `url`, created on first use (shared past HTTP_MAX_HOSTS)."""
+    global _overflow_session
+    host = _host(url)
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None and len(_sessions) < HTTP_MAX_HOSTS:
+                session = _sessions[host] = _new_session(pool_connections=1)
+            elif session is None:
+                # urllib3 keeps an LRU of HTTP_MAX_HOSTS per-host pools in here
+                if _overflow_session is None:
+                    _overflow_session = _new_session(pool_connections=HTTP_MAX_HOSTS)
+                session = _overflow_session
+    return session
+
+
+def _backoff(attempt):
+    # Full jitter: uniform over [0, base * 2^attempt], capped
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _attempt(session, stats, method, url, kwargs):
+    """One call, recorded in the host's stats, breaker and span metrics."""
+    host = stats.host
+    metrics.IN_FLIGHT.inc("http", host)
+    start = time.perf_counter()
+    try:
+        resp = session.request(method, url, **kwargs)
+    except Exception:
+        elapsed = time.perf_counter() - start
+        stats.record(elapsed, error=True)
+        if stats.breaker is not None:
+            stats.breaker.record(failed=True)
+        metrics.observe_span("http", host, elapsed, error=True)
+        raise
+    finally:
+        metrics.IN_FLIGHT.dec("http", host)
+    elapsed = time.perf_counter() - start
+    failed = resp.status_code >= 500 or resp.status_code == 429
+    stats.record(elapsed, status=resp.status_code, error=failed)
+    if stats.breaker is not None:
+        stats.breaker.record(failed=failed)
+    metrics.observe_span("http", host, elapsed, error=failed)
+    return resp
+
+
+def _close_quietly(future):
+    try:
+        future.result().close()
+    except Exception:
+        pass
+
+
+def _hedged_attempt(session, stats, method, url, kwargs):
+    """Send once; if that outlives the host's p95, send a second copy and take the first answer."""
+    delay = stats.percentile(95, min_samples=HTTP_HEDGE_MIN_SAMPLES)
+    if delay is None:
+        return _attempt(session, stats, method, url, kwargs)
+
+    primary = _hedge_pool.submit(_attempt, session, stats, method, url, kwargs)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    with stats.lock:
+        stats.hedges += 1
+    hedge = _hedge_pool.submit(_attempt, session, stats, method, url, kwargs)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                resp = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if resp.status_code >= 500 and pending:
+                resp.close()
+                continue
+            if future is hedge:
+                with stats.lock:
+                    stats.hedge_wins += 1
+            for other in pending:
+                other.add_done_callback(_close_quietly)
+            return resp
+    raise error
+
+
+def request(method, url, retries=None, hedge=False, pooled=True, **kwargs):
+    """
+    Send a request through the pooled session for the URL's host.
+
+    Same keyword arguments as requests.request. `timeout` defaults to
+    (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT). Idempotent methods are retried up to
+    `retries` times (default HTTP_RETRIES) on connection errors, timeouts and
+    429/502/503/504; other methods are sent once. With `hedge=True` (idempotent,
+    non-streaming calls only) a slow attempt is raced against a second copy.
+    Raises CircuitOpenError without calling the host while its breaker is open.
+    With `pooled=False` the call gets a throwaway session and is counted as
+    "other", for one-off hosts that shouldn't each keep a pool and a breaker.
+    Other errors are raised as the usual requests exceptions, and the last
+    response is returned even if it is an error.
+    """
+    method = method.upper()
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    if retries is None:
+        retries = HTTP_RETRIES if method in IDEMPOTENT_METHODS else 0
+    hedge = hedge and HTTP_HEDGE and method in IDEMPOTENT_METHODS and not kwargs.get("stream")
+
+    host = _host(url)
+    stats = _host_stats(host) if pooled else _other_stats()
+    if host in HTTP_HOST_OVERRIDES:
+        parts = urlsplit(url)
+        url = HTTP_HOST_OVERRIDES[host] + parts.path + (f"?{parts.query}" if parts.query else "")
+    if not pooled:
+        # Closing the session only drops its idle pool; a streamed response keeps its connection
+        with requests.Session() as session:
+            return _attempt(session, stats, method, url, kwargs)
+    session = session_for(url)
+    send = _hedged_attempt if hedge else _attempt
+
+    attempt = 0
+    while True:
+        if stats.breaker is not None and not stats.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {host}, failing fast")
+        try:
+            resp = send(session, stats, method, url, kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                return resp
+            resp.close()
+        with stats.lock:
+            stats.retries += 1
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+def breaker_states():
+    """{host: breaker snapshot} for every host called so far."""
+    return {host: stats.breaker.snapshot() for host, stats in list(_stats.items()) if stats.breaker is not None}
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def host_stats():
+    """Per-host request counts, errors, retries, hedges, status codes, latency percentiles and breaker state."""
+    return {host: stats.snapshot() for host, stats in list(_stats.items())}
+
+
+def latency_percentile(url_or_host, q):
+    """q-th percentile latency in seconds seen for a host, or None with no data yet."""
+    host = _host(url_or_host) if "://" in url_or_host else url_or_host.lower()
+    stats = _stats.get(host)
+    return stats.percentile(q) if stats is not None else None
@@ -0,0 +1,176 @@
+"""
+Structured logging for the API.
+
+Modules log through `logging.getLogger(__name__)` and pass structured fields
+with `extra=`:
+
+    log.info("trade-in resolved", extra={"source": source, "value": value})
+
+setup_logging() puts a QueueHandler on the root logger, so request threads only
+enqueue records; a single listener thread formats them and writes to stdout.
+Every record carries the fields bound for the current request (request_id,
+method, path) and is emitted as one JSON object per line (LOG_FORMAT=text for
+readable local output).
+
+Fields that identify a person's finances or contact details (income, credit
+score, phone number) are replaced with "[redacted]" unless LOG_REDACT=0.
+
+Environment:
+    LOG_LEVEL   root level, default INFO
+    LOG_LEVELS  per-module overrides, e.g. "predict_loan=DEBUG,http_client=WARNING"
+    LOG_FORMAT  json (default) or text
+    LOG_REDACT  1 (default) or 0
+"""
+import atexit
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_REDACT = os.getenv("LOG_REDACT", "1") == "1"
+
+REDACTED = "[redacted]"
+SENSITIVE_FIELDS = {
+    "income", "income_annum", "annual_income", "annualIncome",
+    "cibil_score", "credit_score", "creditScore",
+    "phone_number", "to_number",
+}
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_traceback_formatter = logging.Formatter()
+_context = contextvars.ContextVar("log_context", default={})
+_listener = None
+_handler = None
+
+
+def bind(**fields):
+    """Attach fields to every record logged from the current request/thread."""
+    _context.set({**_context.get(), **fields})
+
+
+def clear():
+    _context.set({})
+
+
+def context():
+    return dict(_context.get())
+
+
+def redact(value):
+    """Copy of `value` with sensitive keys masked, recursing into dicts and lists."""
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SENSITIVE_FIELDS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class _ContextFilter(logging.Filter):
+    """Runs in the caller's thread: stamps request fields and masks PII before queueing."""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        if LOG_REDACT:
+            for key, value in _fields(record).items():
+                setattr(record, key, REDACTED if key in SENSITIVE_FIELDS else redact(value))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve the message and traceback here (args and exc_info may not be
+        # safe to touch later), but leave the formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_listener():
+    global _listener
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    _handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_handler.queue, stream, respect_handler_level=False)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork; each server worker needs its own
+    if _handler is not None:
+        _start_listener()
+
+
+def _parse_levels(spec):
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, level = part.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Install the queue handler on the root logger. Safe to call more than once."""
+    global _handler
+    if _handler is not None:
+        return
+    _handler = _QueueHandler(queue.SimpleQueue())
+    _handler.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _start_listener()
+    atexit.register(lambda: _listener and _listener.stop())
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,199 @@
+"""
+In-process metrics with a Prometheus text exposition (served at GET /metrics).
+
+    with metrics.span("firestore", "cars.page"):
+        docs = list(query.stream())
+
+Request latency per route, span latency per kind/name (Firestore, outbound HTTP
+per host, embedding, vector query, LLM, model inference) and in-flight counts
+are recorded as they happen; an observation is a bisect and a locked increment.
+Cache and breaker numbers the modules already keep are read only when /metrics
+is scraped, through collectors registered with register_collector().
+
+Metrics are per process: under gunicorn a scrape is answered by whichever
+worker takes it, and each series carries that worker's numbers only.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, plus one overflow slot, sum
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        lines = self._header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, {'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request handling time by route",
+                            ("route", "method", "status"))
+SPAN_SECONDS = Histogram("span_duration_seconds", "Time spent in dependencies by kind and name",
+                         ("kind", "name"))
+SPAN_ERRORS = Counter("span_errors_total", "Dependency calls that raised", ("kind", "name"))
+IN_FLIGHT = Gauge("in_flight", "Requests and dependency calls currently running", ("kind", "name"))
+
+
+@contextmanager
+def span(kind, name=""):
+    """Time the enclosed block as one `kind`/`name` dependency call."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    IN_FLIGHT.inc(kind, name)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SPAN_ERRORS.inc(kind, name)
+        raise
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - start, kind, name)
+        IN_FLIGHT.dec(kind, name)
+
+
+def observe_span(kind, name, seconds, error=False):
+    """Record a dependency call timed by the caller."""
+    if not METRICS_ENABLED:
+        return
+    SPAN_SECONDS.observe(seconds, kind, name)
+    if error:
+        SPAN_ERRORS.inc(kind, name)
+
+
+def register_collector(collect):
+    """
+    Add a scrape-time source. `collect()` returns (name, type, help, samples)
+    tuples where samples is a list of (labels dict, value).
+    """
+    _collectors.append(collect)
+
+
+CACHE_COUNTERS = {"hits", "stale_hits", "misses", "coalesced", "refreshes", "errors", "invalidations", "evictions"}
+CACHE_GAUGES = {"size", "in_flight"}
+
+
+def cache_collector(caches):
+    """
+    Collector for {cache name: stats function} pairs. Known counter and gauge
+    keys of the stats dict are exported; anything else (hit_rate, config) is not.
+    """
+    def collect():
+        families = {}
+        for cache, stats in caches.items():
+            for key, value in stats().items():
+                if key in CACHE_GAUGES:
+                    name, kind = f"cache_{key}", "gauge"
+                elif key in CACHE_COUNTERS:
+                    name, kind = f"cache_{key}_total", "counter"
+                else:
+                    continue
+                families.setdefault((name, kind), []).append(({"cache": cache}, value))
+        return [(name, kind, f"Cache {name.replace('cache_', '').replace('_total', '')}", samples)
+                for (name, kind), samples in sorted(families.items())]
+    return collect
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception:
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
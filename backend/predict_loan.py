@@ -1,35 +1,125 @@
 import pandas as pd
 import numpy as np
+import logging
 import pickle
 import os
+import threading
+from collections import OrderedDict, namedtuple
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 
-# Try to load the trained model, fallback to rule-based if not available
-_model = None
-_feature_names = None
+import metrics
 
-def _load_model():
-    global _model, _feature_names
-    if _model is None:
+log = logging.getLogger(__name__)
+
+# The served model, published as one tuple so a request never mixes the model of
+# one load with the tier/version of another. Reloads are serialized by _load_lock.
+_Loaded = namedtuple("_Loaded", "model feature_names tier version requested_tier")
+_loaded = _Loaded(None, None, None, None, None)
+_load_lock = threading.Lock()
+
+# Which model artifact to serve. "full" is the original forest from save_model.py,
+# the compact tiers (shallow_forest, boosted_stumps, logistic) come from
+# train_compact_models.py and are stored as loan_model_<tier>.pkl
+LOAN_MODEL_TIER = os.getenv("LOAN_MODEL_TIER", "full")
+
+def _model_path(tier):
+    if tier == "full":
+        return os.path.join(os.path.dirname(__file__), 'loan_model.pkl')
+    return os.path.join(os.path.dirname(__file__), f'loan_model_{tier}.pkl')
+
+def _artifact_version(tier):
+    """(tier, mtime, size) of the artifact that would be served, None if it is missing."""
+    model_path = _model_path(tier)
+    if tier != "full" and not os.path.exists(model_path):
+        tier = "full"
+        model_path = _model_path(tier)
+    try:
+        st = os.stat(model_path)
+    except OSError:
+        return None
+    return (tier, st.st_mtime_ns, st.st_size)
+
+def _is_current(loaded, tier, version):
+    return loaded.model is not None and loaded.requested_tier == tier and loaded.version == version
+
+def _load_model(tier=None):
+    """The _Loaded to serve for `tier`, (re)loading it if the artifact changed."""
+    global _loaded
+    tier = tier or LOAN_MODEL_TIER
+    # Re-stat every call so a retrained artifact is picked up without a restart
+    version = _artifact_version(tier)
+    loaded = _loaded
+    if _is_current(loaded, tier, version):
+        return loaded
+    with _load_lock:
+        loaded = _loaded
+        if _is_current(loaded, tier, version):
+            return loaded  # another thread loaded it while this one waited
         try:
-            model_path = os.path.join(os.path.dirname(__file__), 'loan_model.pkl')
+            served_tier = tier
+            model_path = _model_path(served_tier)
+            if served_tier != "full" and not os.path.exists(model_path):
+                log.warning("no artifact for tier %s at %s, using full model; run train_compact_models.py to build it", tier, model_path)
+                served_tier = "full"
+                model_path = _model_path(served_tier)
             features_path = os.path.join(os.path.dirname(__file__), 'model_features.pkl')
             if os.path.exists(model_path) and os.path.exists(features_path):
                 with open(model_path, 'rb') as f:
-                    _model = pickle.load(f)
+                    model = pickle.load(f)
                 with open(features_path, 'rb') as f:
-                    _feature_names = pickle.load(f)
-                print("[MODEL] Model loaded successfully")
-                print(f"[MODEL] Feature names: {_feature_names}")
-            else:
-                print(f"[MODEL] Model files not found. Model path exists: {os.path.exists(model_path)}, Features path exists: {os.path.exists(features_path)}")
-        except Exception as e:
-            print(f"[MODEL] Could not load model: {e}")
-            import traceback
-            traceback.print_exc()
-
-def predict_loan_approval(income_annum, loan_amount, loan_term, cibil_score, education, self_employed):
+                    feature_names = pickle.load(f)
+                _loaded = _Loaded(model, feature_names, served_tier, version, tier)
+                log.info("model loaded", extra={"tier": served_tier})
+                log.debug("model features", extra={"features": list(feature_names)})
+                return _loaded
+            log.warning("model files not found, using rule-based prediction",
+                        extra={"model_path_exists": os.path.exists(model_path),
+                               "features_path_exists": os.path.exists(features_path)})
+        except Exception:
+            log.exception("could not load model")
+        _loaded = _Loaded(None, None, None, None, tier)
+        return _loaded
+
+# Prediction cache. Quiz users resubmit the same answers a lot, so results are kept
+# in an LRU keyed by the coerced feature vector and dropped whenever the served
+# artifact changes. With LOAN_CACHE_QUANTIZE=1 income and loan amount are rounded
+# to buckets first, so nearby answers share an entry (and get the bucket's result).
+LOAN_CACHE_SIZE = int(os.getenv("LOAN_CACHE_SIZE", "4096"))
+LOAN_CACHE_QUANTIZE = os.getenv("LOAN_CACHE_QUANTIZE", "0") == "1"
+LOAN_CACHE_INCOME_STEP = float(os.getenv("LOAN_CACHE_INCOME_STEP", "1000"))
+LOAN_CACHE_LOAN_STEP = float(os.getenv("LOAN_CACHE_LOAN_STEP", "500"))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_version = None
+_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+def _quantize(value, step):
+    if step <= 0:
+        return value
+    return float(round(value / step) * step)
+
+def cache_stats():
+    """Hit/miss counters and current size of the prediction cache."""
+    with _cache_lock:
+        total = _cache_stats["hits"] + _cache_stats["misses"]
+        return {
+            **_cache_stats,
+            "size": len(_cache),
+            "max_size": LOAN_CACHE_SIZE,
+            "hit_rate": round(_cache_stats["hits"] / total, 4) if total else 0.0,
+            "quantize": LOAN_CACHE_QUANTIZE,
+            "model_version": list(_cache_version) if _cache_version else None,
+        }
+
+def clear_cache():
+    global _cache_version
+    with _cache_lock:
+        _cache.clear()
+        _cache_version = None
+
+def predict_loan_approval(income_annum, loan_amount, loan_term, cibil_score, education, self_employed, tier=None):
     """
     Predict loan approval based on user inputs.
     
@@ -40,18 +130,56 @@ def predict_loan_approval(income_annum, loan_amount, loan_term, cibil_score, edu
         cibil_score: Credit score (300-850)
         education: 1 if college graduate, 0 if not
         self_employed: 1 if self-employed, 0 if not
+        tier: Model tier to use, defaults to LOAN_MODEL_TIER
     
     Returns:
         dict with approval status and probability
     """
-    # Try to use trained model, fallback to rule-based
-    _load_model()
-    
-    if _model is not None and _feature_names is not None:
+    global _cache_version
+    loaded = _load_model(tier)
+
+    if LOAN_CACHE_QUANTIZE:
+        income_annum = _quantize(income_annum, LOAN_CACHE_INCOME_STEP)
+        loan_amount = _quantize(loan_amount, LOAN_CACHE_LOAN_STEP)
+
+    if LOAN_CACHE_SIZE <= 0:
+        return _predict_uncached(loaded, income_annum, loan_amount, loan_term, cibil_score, education, self_employed)
+
+    key = (loaded.tier, income_annum, loan_amount, loan_term, cibil_score, education, self_employed)
+    with _cache_lock:
+        if _cache_version != loaded.version:
+            if _cache:
+                _cache_stats["invalidations"] += 1
+            _cache.clear()
+            _cache_version = loaded.version
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return dict(result)
+        _cache_stats["misses"] += 1
+
+    result = _predict_uncached(loaded, income_annum, loan_amount, loan_term, cibil_score, education, self_employed)
+
+    with _cache_lock:
+        if _cache_version != loaded.version:
+            return result  # the model was swapped while this one was predicting
+        _cache[key] = dict(result)
+        while len(_cache) > LOAN_CACHE_SIZE:
+            _cache.popitem(last=False)
+            _cache_stats["evictions"] += 1
+    return result
+
+def _predict_uncached(loaded, income_annum, loan_amount, loan_term, cibil_score, education, self_employed):
+    """Run the loaded model (or the rule-based fallback) without touching the cache."""
+    # Try to use trained model (loaded by predict_loan_approval), fallback to rule-based
+    if loaded.model is not None and loaded.feature_names is not None:
         try:
-            print(f"[MODEL] Using trained model for prediction")
-            print(f"[MODEL] Input features - income: {income_annum}, loan_amount: {loan_amount}, loan_term: {loan_term}, credit: {cibil_score}, education: {education}, self_employed: {self_employed}")
-            
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("model input", extra={"tier": loaded.tier, "income_annum": income_annum, "loan_amount": loan_amount,
+                                                "loan_term": loan_term, "cibil_score": cibil_score,
+                                                "education": education, "self_employed": self_employed})
+
             # Create feature vector matching the model's expected format
             # The model expects: income_annum, loan_amount, loan_term, cibil_score, education, self_employed
             # Plus other features that were in the training data (set to 0 or median)
@@ -70,36 +198,29 @@ def predict_loan_approval(income_annum, loan_amount, loan_term, cibil_score, edu
             })
             
             # Ensure all required features are present
-            for feature in _feature_names:
+            for feature in loaded.feature_names:
                 if feature not in features.columns:
                     features[feature] = 0
-                    print(f"[MODEL] Added missing feature: {feature} = 0")
             
             # Reorder columns to match training data
-            features = features[_feature_names]
-            print(f"[MODEL] Feature vector shape: {features.shape}")
-            print(f"[MODEL] Feature vector columns: {list(features.columns)}")
+            features = features[loaded.feature_names]
             
-            # Predict
-            prediction = _model.predict(features)[0]
-            proba = _model.predict_proba(features)[0]
+            # Predict - one predict_proba pass, the label is just its argmax
+            with metrics.span("model", "loan"):
+                proba = loaded.model.predict_proba(features)[0]
+            prediction = loaded.model.classes_[int(np.argmax(proba))]
             probability = proba[1] if len(proba) > 1 else proba[0]
-            
-            print(f"[MODEL] Prediction: {prediction}, Probability: {probability}")
-            
+
             return {
                 "approved": bool(prediction),
                 "probability": round(float(probability), 3),
                 "score": round(float(probability * 100), 1),
                 "reason": "Model prediction based on your profile" if prediction else "Model indicates loan may not be approved based on your profile"
             }
-        except Exception as e:
-            print(f"[MODEL] Error using model: {e}")
-            import traceback
-            traceback.print_exc()
-            print("[MODEL] Falling back to rule-based prediction.")
+        except Exception:
+            log.exception("model prediction failed, falling back to rule-based prediction")
     else:
-        print("[MODEL] Model not available, using rule-based prediction.")
+        log.debug("model not available, using rule-based prediction")
     
     # Fallback: Rule-based prediction
     loan_to_income_ratio = loan_amount / income_annum if income_annum > 0 else 999
@@ -150,3 +271,48 @@ def predict_loan_approval(income_annum, loan_amount, loan_term, cibil_score, edu
         "reason": "High credit score and favorable loan-to-income ratio" if approved else "Credit score or loan amount may be too high relative to income"
     }
 
+
+def predict_approval_probabilities(income_annum, loan_amounts, loan_terms, cibil_score, education, self_employed, tier=None):
+    """
+    Approval probability for many loan amount/term pairs for one applicant, in a
+    single predict_proba call. Used by financing.py to score a whole grid at once.
+    
+    Args:
+        loan_amounts: Array of loan amounts
+        loan_terms: Array of loan terms in years, same length as loan_amounts
+        (the rest as in predict_loan_approval)
+    
+    Returns:
+        numpy array of probabilities, same length as loan_amounts
+    """
+    loaded = _load_model(tier)
+    loan_amounts = np.asarray(loan_amounts, dtype=float)
+    loan_terms = np.asarray(loan_terms, dtype=float)
+    n = len(loan_amounts)
+    
+    if loaded.model is not None and loaded.feature_names is not None:
+        try:
+            columns = {
+                'income_annum': np.full(n, float(income_annum)),
+                'loan_amount': loan_amounts,
+                'loan_term': loan_terms,
+                'cibil_score': np.full(n, cibil_score),
+                'education': np.full(n, education),
+                'self_employed': np.full(n, self_employed),
+            }
+            features = pd.DataFrame({name: columns.get(name, np.zeros(n)) for name in loaded.feature_names})
+            with metrics.span("model", "loan_batch"):
+                proba = loaded.model.predict_proba(features)
+            return proba[:, 1] if proba.shape[1] > 1 else proba[:, 0]
+        except Exception:
+            log.exception("batch model prediction failed, falling back to rule-based prediction")
+    
+    # Same scoring as the rule-based fallback in _predict_uncached, vectorized
+    ratio = loan_amounts / income_annum if income_annum > 0 else np.full(n, 999.0)
+    score = np.zeros(n)
+    score += np.select([cibil_score >= 750, cibil_score >= 700, cibil_score >= 650, cibil_score >= 600], [40, 30, 20, 10], 0)
+    score += np.select([ratio <= 0.3, ratio <= 0.5, ratio <= 0.7], [30, 20, 10], 0)
+    score += 15 if education == 1 else 0
+    score += 5 if self_employed == 0 else 0
+    score += np.select([loan_terms <= 3, loan_terms <= 5], [10, 5], 0)
+    return np.clip(score / 100, 0.01, 0.99)
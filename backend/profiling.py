@@ -0,0 +1,171 @@
+"""
+Opt-in profiling of live requests.
+
+A request to one of PROFILE_ROUTES is profiled when it carries
+`X-Profile: <PROFILE_ADMIN_TOKEN>`, or at random with probability
+PROFILE_SAMPLE_RATE. The profile is written to PROFILE_DIR and its id is
+returned in the `X-Profile-ID` response header.
+
+Two modes (PROFILE_MODE):
+    sample    (default) a background thread records the request thread's stack
+              every PROFILE_INTERVAL_MS and writes `<id>.folded`, the collapsed
+              stack format flamegraph.pl and speedscope read directly.
+    cprofile  deterministic cProfile of the request thread, written as
+              `<id>.prof` (pstats; render with snakeviz, flameprof, ...).
+
+With neither a token nor a sample rate configured, install() adds no hooks at
+all. At most PROFILE_MAX_CONCURRENT requests are profiled at once (always one in
+cprofile mode: only one cProfile can be active per process) and only the
+newest PROFILE_KEEP files are kept.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, request
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "").strip()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ROUTES = set(os.getenv("PROFILE_ROUTES", "/ask,/data/cars,/predict/loan").split(","))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+log = logging.getLogger(__name__)
+
+# cProfile hooks the whole interpreter, so a second profiler can't run alongside the first
+_slots = threading.BoundedSemaphore(1 if PROFILE_MODE == "cprofile" else max(PROFILE_MAX_CONCURRENT, 1))
+
+
+def enabled():
+    return bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfile:
+    def __init__(self, mode):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+            self._profiler.start()
+
+    def finish(self):
+        """Stop profiling and write the file. Returns its path."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self.mode == "cprofile":
+            self._profiler.disable()
+            path = os.path.join(PROFILE_DIR, f"{self.id}.prof")
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.stop()
+            path = os.path.join(PROFILE_DIR, f"{self.id}.folded")
+            self._profiler.save(path)
+        _prune()
+        return path
+
+
+def _prune():
+    try:
+        files = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR)]
+        files.sort(key=os.path.getmtime)
+        for path in files[:-PROFILE_KEEP]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _token_matches(header):
+    # Constant-time, so the token can't be guessed byte by byte from response timing
+    return header is not None and hmac.compare_digest(header.encode(), PROFILE_ADMIN_TOKEN.encode())
+
+
+def _wanted():
+    if request.url_rule is None or request.url_rule.rule not in PROFILE_ROUTES:
+        return False
+    if PROFILE_ADMIN_TOKEN and _token_matches(request.headers.get("X-Profile")):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def install(app):
+    """Register the profiling hooks on `app` if profiling is configured."""
+    if not enabled():
+        return
+
+    @app.before_request
+    def start_profile():
+        if not _wanted() or not _slots.acquire(blocking=False):
+            return
+        g.profile = RequestProfile(PROFILE_MODE)
+
+    @app.after_request
+    def add_profile_header(response):
+        if "profile" in g:
+            response.headers["X-Profile-ID"] = g.profile.id
+        return response
+
+    @app.teardown_request
+    def finish_profile(error=None):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        try:
+            path = profile.finish()
+            log.info("request profiled", extra={"profile_id": profile.id, "mode": profile.mode, "file": path,
+                                                "duration_ms": round((time.perf_counter() - profile.started) * 1000, 2)})
+        except Exception:
+            log.exception("could not save profile")
+        finally:
+            _slots.release()
@@ -2,13 +2,22 @@
 from sentence_transformers import SentenceTransformer
 import chromadb
 import google.generativeai as genai
+import logging
 import pandas as pd
 import pickle
 import os
 from dotenv import load_dotenv
 
+import metrics
+
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+log = logging.getLogger(__name__)
+# GEMINI_API_ENDPOINT points the SDK at another host (e.g. the benchmark stub server)
+if os.getenv("GEMINI_API_ENDPOINT"):
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                    client_options={"api_endpoint": os.getenv("GEMINI_API_ENDPOINT")})
+else:
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 # Initialize embedding model
 embedder = SentenceTransformer("all-MiniLM-L6-v2")
@@ -20,14 +29,14 @@ VECTORS_PKL = "data/car_vectors.pkl"
 def load_data():
     # Check if vectors are already saved
     if os.path.exists(VECTORS_PKL):
-        print("Loading pre-computed vectors from pickle file...")
+        log.info("loading pre-computed vectors", extra={"path": VECTORS_PKL})
         with open(VECTORS_PKL, "rb") as f:
             data = pickle.load(f)
             texts = data["texts"]
             embeddings = data["embeddings"]
             hack_ids = data["hack_ids"]
     else:
-        print("Computing vectors for the first time...")
+        log.info("computing vectors for the first time")
         df = pd.read_csv("data/car_data_processed.csv")
         
         # Create rich text descriptions for each car
@@ -52,7 +61,7 @@ def load_data():
         # Save vectors to pickle file
         with open(VECTORS_PKL, "wb") as f:
             pickle.dump({"texts": texts, "embeddings": embeddings, "hack_ids": hack_ids}, f)
-        print(f"Vectors saved to {VECTORS_PKL}")
+        log.info("vectors saved", extra={"path": VECTORS_PKL})
     
     # Create collection and add to ChromaDB with metadata
     collection = chroma_client.create_collection("cars")
@@ -68,8 +77,10 @@ def load_data():
 collection = load_data()  # preload data at app start
 
 def query_rag(question):
-    query_emb = embedder.encode([question])
-    results = collection.query(query_embeddings=query_emb.tolist(), n_results=5)
+    with metrics.span("embedding", "minilm"):
+        query_emb = embedder.encode([question])
+    with metrics.span("vector_query", "chroma"):
+        results = collection.query(query_embeddings=query_emb.tolist(), n_results=5)
     
     # Extract context and hack_ids from results
     context = "\n\n".join(results["documents"][0])
@@ -86,7 +97,8 @@ def query_rag(question):
     """
 
     model = genai.GenerativeModel("gemini-2.0-flash-exp")
-    response = model.generate_content(prompt)
+    with metrics.span("llm", "gemini"):
+        response = model.generate_content(prompt)
     
     return {
         "answer": response.text,
@@ -0,0 +1,105 @@
+"""
+Per-session swipe recommendations.
+
+Each session keeps a preference vector in the space of car_vectors.py. A like
+adds the car's vector to it and a pass subtracts a smaller share, after the old
+preference decays a little, so recent swipes count most. The next cars are the
+unseen ones with the highest dot product against the preference: one
+matrix-vector product over the catalog per request.
+
+Sessions live in this worker's memory and expire after RECOMMENDATION_SESSION_TTL
+seconds without a swipe; an expired or unknown session starts over.
+"""
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+
+import car_vectors
+import metrics
+from ttl_cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+RECOMMENDATION_SESSION_TTL = int(os.getenv("RECOMMENDATION_SESSION_TTL", "1800"))
+RECOMMENDATION_SESSIONS_MAX = int(os.getenv("RECOMMENDATION_SESSIONS_MAX", "10000"))
+LIKE_WEIGHT = 1.0
+PASS_WEIGHT = -0.5
+DECAY = 0.9
+ACTIONS = {"like": LIKE_WEIGHT, "pass": PASS_WEIGHT}
+
+sessions = TTLCache(ttl=RECOMMENDATION_SESSION_TTL, max_size=RECOMMENDATION_SESSIONS_MAX,
+                    name="recommendation-sessions")
+
+_catalog = None  # (hack_ids, {hack_id: row}, matrix)
+_catalog_lock = threading.Lock()
+
+
+class _Session:
+    def __init__(self, dims):
+        self.preference = np.zeros(dims, dtype=np.float32)
+        self.seen = set()  # catalog rows already swiped
+        self.swipes = 0
+        self.lock = threading.Lock()
+
+
+def _load_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                hack_ids, matrix = car_vectors.load()
+                _catalog = (hack_ids, {h: i for i, h in enumerate(hack_ids)}, matrix)
+    return _catalog
+
+
+def _session(session_id, dims):
+    session = sessions.peek(session_id) if session_id else None
+    if session is None:
+        session_id = session_id or uuid.uuid4().hex
+        session = _Session(dims)
+    return session_id, session
+
+
+def feed(session_id=None, events=(), limit=10):
+    """
+    Apply `events` ([{"hack_id": ..., "action": "like" | "pass"}, ...]) to the
+    session, then return (session_id, [(hack_id, score), ...]) for the next
+    `limit` unseen cars, best first. Events for unknown cars are ignored.
+    """
+    hack_ids, rows, matrix = _load_catalog()
+    session_id, session = _session(session_id, matrix.shape[1])
+
+    with session.lock:
+        for event in events:
+            row = rows.get(event.get("hack_id"))
+            weight = ACTIONS.get(event.get("action"))
+            if row is None or weight is None:
+                continue
+            session.preference *= DECAY
+            session.preference += weight * matrix[row]
+            session.seen.add(row)
+            session.swipes += 1
+
+        with metrics.span("model", "recommendation"):
+            if session.swipes:
+                scores = matrix @ session.preference
+            else:
+                # Nothing to go on yet, so start with a random deck
+                scores = np.random.default_rng().random(len(hack_ids), dtype=np.float32)
+            if session.seen:
+                scores[list(session.seen)] = -np.inf
+
+            limit = min(limit, len(hack_ids) - len(session.seen))
+            if limit <= 0:
+                picks = []
+            else:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                picks = top[np.argsort(-scores[top])]
+    # Re-storing refreshes the session's TTL
+    sessions.set(session_id, session)
+
+    scored = session.swipes > 0
+    return session_id, [(hack_ids[i], round(float(scores[i]), 4) if scored else None) for i in picks]
@@ -0,0 +1,50 @@
+import os
+
+from flask import Blueprint, request
+
+import dealer_calls
+
+bp = Blueprint("calls", __name__)
+
+
+@bp.route('/dealer-call', methods=['POST'])
+def outbound_call():
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    try:
+        phone_number = data["phone_number"]
+    except Exception as e:
+        phone_number = os.getenv("PHONE_NUMBER")
+
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key is None and isinstance(data, dict):
+        idempotency_key = data.get("idempotency_key")
+
+    # The ElevenLabs call is placed by the dealer_calls worker pool, not this request thread
+    try:
+        job, created = dealer_calls.submit_call(phone_number, idempotency_key)
+    except dealer_calls.RateLimited as e:
+        return {"error": str(e)}, 429, {"Retry-After": str(int(e.retry_after) + 1)}
+    except dealer_calls.QueueFull as e:
+        return {"error": str(e)}, 503
+    except dealer_calls.DuplicateRequest as e:
+        return {"error": str(e)}, 409
+
+    return {
+        "message": "Call queued" if created else "Call already requested",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/dealer-call/{job['job_id']}"
+    }, 202 if created else 200
+
+
+@bp.route('/dealer-call/<job_id>', methods=['GET'])
+def outbound_call_status(job_id):
+    job = dealer_calls.get_job(job_id)
+    if job is None:
+        return {"error": "Job not found"}, 404
+    job.pop("idempotency_key", None)
+    return job, 200
@@ -0,0 +1,491 @@
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import Blueprint, jsonify, request
+
+import catalog_arrays
+import catalog_version
+import metrics
+import search_index
+import similar_cars
+from car_schema import CAR_FIELDS, coerce_car
+from database import get_db
+from http_caching import etag_matches
+from routes.images import fetch_and_save_image
+
+bp = Blueprint("catalog", __name__)
+log = logging.getLogger(__name__)
+
+_SIMPLE_FIELD = re.compile(r"^[_a-zA-Z][_a-zA-Z0-9]*$")
+_counts = {}  # catalog version -> number of cars
+
+
+class BadFields(ValueError):
+    pass
+
+
+def _requested_fields(raw):
+    """
+    fields= as a list of car fields (always including img_path, which the image
+    backfill needs), or None when no projection was asked for.
+    """
+    if not raw:
+        return None
+    fields = [f.strip() for f in (raw.split(",") if isinstance(raw, str) else raw) if f.strip()]
+    unknown = [f for f in fields if f not in CAR_FIELDS]
+    if unknown:
+        raise BadFields(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields + ["img_path"]))
+
+
+def _field_paths(fields):
+    # Firestore needs names like hack-id quoted as `hack-id`
+    return [f if _SIMPLE_FIELD.match(f) else f"`{f}`" for f in fields]
+
+
+def _project(car_data, fields):
+    """Keep only requested fields (plus hack_id) and drop empty values."""
+    if fields is None:
+        return car_data
+    return {k: v for k, v in car_data.items()
+            if (k in fields or k == "hack_id") and v is not None and v != ""}
+
+
+def _etag(*parts):
+    key = "|".join(str(p) for p in (catalog_version.get_version(),) + parts)
+    return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+
+def _cacheable(response, etag):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"  # always revalidate, usually with a 304
+    return response
+
+
+def _not_modified(etag):
+    response = jsonify({})
+    response.status_code = 304
+    response.set_data(b"")
+    return _cacheable(response, etag)
+
+
+def _total_cars(cars_ref):
+    version = catalog_version.get_version()
+    total = _counts.get(version)
+    if total is None:
+        with metrics.span("firestore", "cars.count"):
+            total = sum(1 for _ in cars_ref.select([]).stream())
+        _counts.clear()
+        _counts[version] = total
+    return total
+
+
+@bp.route('/data/cars', methods=['GET'])
+def get_cars():
+    if request.args.get('hack-id') is not None:
+        return get_car_by_query()
+
+    try:
+        page = int(request.args.get('page', 1))
+        if page < 1:
+            page = 1
+        fields = _requested_fields(request.args.get('fields'))
+    except BadFields as e:
+        return {"error": str(e)}, 400
+    except ValueError:
+        return {"error": "Invalid page number"}, 400
+
+    # Pages only change with the catalog version, so a repeat visit can be
+    # answered before touching Firestore
+    etag = _etag("page", page, fields)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return _not_modified(etag)
+
+    # Calculate pagination
+    page_size = 16
+    offset = (page - 1) * page_size
+    
+    # Query Firestore for paginated cars
+    cars_ref = get_db().collection("cars")
+    query = cars_ref.limit(page_size).offset(offset)
+    if fields is not None:
+        query = query.select(_field_paths(fields))
+    with metrics.span("firestore", "cars.page"):
+        docs = list(query.stream())
+    
+    cars = []
+    complete = True
+    for doc in docs:
+        car_data = doc.to_dict()
+        hack_id = doc.id
+        
+        # Check if img_path is empty
+        if not car_data.get("img_path"):
+            # Fetch and save image
+            img_path = fetch_and_save_image(hack_id, doc.reference)
+            if img_path:
+                car_data["img_path"] = img_path
+            else:
+                complete = False
+        
+        car_data["hack_id"] = hack_id
+        cars.append(_project(car_data, fields))
+    
+    # Get total count for pagination info
+    total_cars = _total_cars(cars_ref)
+    total_pages = (total_cars + page_size - 1) // page_size
+    
+    response = jsonify({
+        "cars": cars,
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total_cars": total_cars,
+            "total_pages": total_pages,
+            "has_next": page < total_pages,
+            "has_prev": page > 1
+        }
+    })
+    # A car whose image couldn't be fetched may get one next time, so don't let that page be cached
+    return _cacheable(response, etag) if complete else response
+
+@bp.route('/data/cars/<hack_id>', methods=['GET'])
+def get_car_by_hack_id(hack_id):
+    # Replace % with space
+    hack_id_cleaned = hack_id.replace('%', ' ')
+    try:
+        fields = _requested_fields(request.args.get('fields'))
+    except BadFields as e:
+        return {"error": str(e)}, 400
+
+    etag = _etag("car", hack_id_cleaned, fields)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return _not_modified(etag)
+    
+    car_ref = get_db().collection("cars").document(hack_id_cleaned)
+    with metrics.span("firestore", "cars.get"):
+        doc = car_ref.get(field_paths=_field_paths(fields)) if fields is not None else car_ref.get()
+    
+    if not doc.exists:
+        return jsonify({"error": "Car not found"}), 404
+    
+    car_data = doc.to_dict()
+    
+    # If no image path, fetch and save it
+    if not car_data.get("img_path"):
+        img_path = fetch_and_save_image(hack_id_cleaned, car_ref)
+        if img_path:
+            car_data["img_path"] = img_path
+
+    car_data["hack_id"] = hack_id_cleaned
+    
+    response = jsonify(_project(car_data, fields))
+    return _cacheable(response, etag) if car_data.get("img_path") else response
+
+
+# Upper bound on ids per batchGet, so one request can't turn into an unbounded read
+BATCH_GET_MAX = int(os.getenv("BATCH_GET_MAX", "100"))
+_image_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="batch-images")
+
+@bp.route('/data/cars:batchGet', methods=['POST'])
+def batch_get_cars():
+    """
+    Details for several cars in one round-trip: {"hack_ids": [...]} ->
+    {"cars": [...]} in request order, with {"hack_id": ..., "found": false}
+    for ids that don't exist. Missing images are fetched in parallel.
+    """
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    hack_ids = data.get("hack_ids") if isinstance(data, dict) else None
+    if not isinstance(hack_ids, list) or not all(isinstance(h, str) for h in hack_ids):
+        return {"error": "Expected {\"hack_ids\": [...]}"}, 400
+    if len(hack_ids) > BATCH_GET_MAX:
+        return {"error": f"At most {BATCH_GET_MAX} hack_ids per request"}, 400
+    try:
+        fields = _requested_fields(data.get("fields") or request.args.get("fields"))
+    except BadFields as e:
+        return {"error": str(e)}, 400
+
+    cleaned = [h.replace('%', ' ') for h in hack_ids]
+    cars_ref = get_db().collection("cars")
+    refs = [cars_ref.document(h) for h in dict.fromkeys(cleaned)]
+    with metrics.span("firestore", "cars.get_all"):
+        field_paths = _field_paths(fields) if fields is not None else None
+        snapshots = {doc.id: doc for doc in get_db().get_all(refs, field_paths=field_paths)} if refs else {}
+
+    found = {}
+    image_fetches = {}
+    for hack_id, doc in snapshots.items():
+        if not doc.exists:
+            continue
+        car_data = doc.to_dict()
+        car_data["hack_id"] = hack_id
+        found[hack_id] = car_data
+        if not car_data.get("img_path"):
+            image_fetches[hack_id] = _image_pool.submit(fetch_and_save_image, hack_id, doc.reference)
+    for hack_id, future in image_fetches.items():
+        img_path = future.result()
+        if img_path:
+            found[hack_id]["img_path"] = img_path
+
+    cars = [_project(found[h], fields) if h in found else {"hack_id": h, "found": False} for h in cleaned]
+    return jsonify({"cars": cars}), 200
+
+
+SIMILAR_MAX = 20
+
+@bp.route('/data/cars/<hack_id>/similar', methods=['GET'])
+def get_similar_cars(hack_id):
+    """
+    Nearest neighbours from the table build_neighbors.py precomputes:
+    {"hack_id": ..., "similar": [{"hack_id": ..., "score": ...}, ...]}.
+    With fields=, each neighbour also carries those fields (one get_all).
+    """
+    hack_id_cleaned = hack_id.replace('%', ' ')
+    try:
+        k = max(1, min(int(request.args.get('k', 10)), SIMILAR_MAX))
+        fields = _requested_fields(request.args.get('fields'))
+    except BadFields as e:
+        return {"error": str(e)}, 400
+    except ValueError:
+        return {"error": "Invalid k"}, 400
+
+    try:
+        neighbours = similar_cars.similar(hack_id_cleaned, k)
+    except similar_cars.NoTable as e:
+        log.warning("similar cars unavailable: %s", e)
+        return {"error": "Similar cars are not available"}, 503
+    if neighbours is None:
+        return {"error": "Car not found"}, 404
+
+    similar = [{"hack_id": h, "score": score} for h, score in neighbours]
+    if fields is not None and similar:
+        cars_ref = get_db().collection("cars")
+        with metrics.span("firestore", "cars.get_all"):
+            snapshots = get_db().get_all([cars_ref.document(s["hack_id"]) for s in similar],
+                                         field_paths=_field_paths(fields))
+            details = {doc.id: doc.to_dict() for doc in snapshots if doc.exists}
+        similar = [{**_project(details.get(s["hack_id"], {}), fields), **s} for s in similar]
+
+    return jsonify({"hack_id": hack_id_cleaned, "similar": similar}), 200
+
+
+
+COMPARE_MAX = int(os.getenv("COMPARE_MAX", "6"))
+# (field, label, True if higher is better / False if lower / None if neither)
+COMPARE_ROWS = (
+    ("estimated_current_cost", "Price", False),
+    ("msrp", "MSRP", False),
+    ("expected_value_2027", "Expected value (2027)", True),
+    ("horsepower_hp", "Horsepower", True),
+    ("torque_ft_lbs", "Torque (ft-lbs)", True),
+    ("combined_mpg", "Combined MPG", True),
+    ("epa_city_mpg", "City MPG", True),
+    ("epa_highway_mpg", "Highway MPG", True),
+    ("range_electric", "Electric range (mi)", True),
+    ("seats", "Seats", True),
+    ("cargo_capacity", "Cargo (cu ft)", True),
+    ("max_cargo_capacity", "Max cargo (cu ft)", True),
+    ("max_towing_capacity", "Towing (lbs)", True),
+    ("max_payload", "Payload (lbs)", True),
+    ("ground_clearance", "Ground clearance (in)", True),
+    ("fuel_tank_capacity", "Fuel tank (gal)", None),
+    ("curb_weight", "Curb weight (lbs)", None),
+)
+COMPARE_CAR_FIELDS = ("year", "make", "model", "trim", "type", "img_path")
+
+@bp.route('/compare', methods=['POST'])
+def compare_cars():
+    """
+    {"hack_ids": [...]} -> one row per spec with each car's value, its percentile
+    across the catalog and within its `type`. Values line up with "cars".
+    """
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    hack_ids = data.get("hack_ids") if isinstance(data, dict) else None
+    if not isinstance(hack_ids, list) or not all(isinstance(h, str) for h in hack_ids) or not hack_ids:
+        return {"error": "Expected {\"hack_ids\": [...]}"}, 400
+    if len(hack_ids) > COMPARE_MAX:
+        return {"error": f"At most {COMPARE_MAX} hack_ids per request"}, 400
+
+    catalog = catalog_arrays.snapshot()
+    columns = catalog_arrays.sorted_columns(catalog)
+    cleaned = [h.replace('%', ' ') for h in hack_ids]
+    positions = [catalog.index.get(h) for h in cleaned]
+
+    cars = []
+    for hack_id, i in zip(cleaned, positions):
+        if i is None:
+            cars.append({"hack_id": hack_id, "found": False})
+            continue
+        car = {"hack_id": hack_id}
+        for field in COMPARE_CAR_FIELDS:
+            if field in catalog.numbers:
+                value = catalog.numbers[field][i]
+                car[field] = int(value) if np.isfinite(value) else None
+            else:
+                car[field] = catalog.text[field][i]
+        cars.append(car)
+
+    rows = []
+    for field, label, higher_is_better in COMPARE_ROWS:
+        everyone, by_type = columns[field]
+        values = []
+        for i in positions:
+            value = catalog.numbers[field][i] if i is not None else np.nan
+            if not np.isfinite(value):
+                values.append(None)
+                continue
+            segment = by_type.get(catalog.text["type"][i], ())
+            values.append({
+                "value": int(value) if value.is_integer() else round(float(value), 2),
+                "percentile": catalog_arrays.percentile(everyone, value),
+                "segment_percentile": catalog_arrays.percentile(segment, value),
+            })
+        present = [v["value"] for v in values if v is not None]
+        if not present:
+            continue
+        best = []
+        if higher_is_better is not None and len(set(present)) > 1:
+            target = max(present) if higher_is_better else min(present)
+            best = [j for j, v in enumerate(values) if v is not None and v["value"] == target]
+        rows.append({"field": field, "label": label, "higher_is_better": higher_is_better,
+                     "values": values, "best": best})
+
+    return jsonify({"cars": cars, "rows": rows}), 200
+
+
+
+SUGGEST_MAX = 25
+SUGGEST_QUERY_MAX_CHARS = 100
+
+@bp.route('/data/cars/suggest', methods=['GET'])
+def suggest_cars():
+    """Autocomplete: ?q=tacoma limted&limit=10 -> ranked cars, tolerant of typos."""
+    query = (request.args.get('q') or "").strip()[:SUGGEST_QUERY_MAX_CHARS]
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), SUGGEST_MAX))
+    except ValueError:
+        return {"error": "Invalid limit"}, 400
+    if not query:
+        return jsonify({"query": query, "results": [], "partial": False}), 200
+
+    catalog = catalog_arrays.snapshot()
+    results, complete = search_index.index(catalog).search(query, limit)
+    if not complete:
+        log.warning("suggest ran over its budget", extra={"query_chars": len(query)})
+    return jsonify({
+        "query": query,
+        "results": [{
+            "hack_id": catalog.hack_ids[i],
+            "year": int(catalog.numbers["year"][i]) if np.isfinite(catalog.numbers["year"][i]) else None,
+            "make": catalog.text["make"][i],
+            "model": catalog.text["model"][i],
+            "trim": catalog.text["trim"][i],
+            "img_path": catalog.text["img_path"][i],
+            "score": score,
+        } for i, score in results],
+        "partial": not complete,
+    }), 200
+
+
+def get_car_by_query():
+    """GET /data/cars?hack-id=... (the lookup sai.py used to serve on :5001)"""
+    hack_id = request.args.get('hack-id')
+
+    # Get user from Firestore
+    doc_ref = get_db().collection("cars").document(hack_id)
+    with metrics.span("firestore", "cars.get"):
+        doc = doc_ref.get()
+    if doc.exists:
+        return {"hack-id": hack_id, "data": doc.to_dict()}, 200 # Return only the phone number
+    else:
+        return {"error": "hack-id not found"}, 404
+
+
+@bp.route('/data/cars', methods=['POST'])
+def add_car():
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    if not isinstance(data, dict):
+        return {"error": "No data provided"}, 400
+
+    car, errors = coerce_car(data)
+    if car is None:
+        log.info("car rejected", extra={"hack_id": data.get("hack-id"), "fields": errors})
+        return {"error": "Missing data", "fields": errors}, 400
+
+    # Add car to Firestore
+    with metrics.span("firestore", "cars.set"):
+        get_db().collection("cars").document(car["hack-id"]).set(car)
+    catalog_version.bump()
+    log.info("car added", extra={"hack_id": car["hack-id"]})
+    response = {"message": "Car added"}
+    if errors:
+        response["warnings"] = errors
+    return response, 200
+
+
+# Firestore rejects write batches with more than 500 operations
+BULK_BATCH_SIZE = 500
+
+@bp.route('/data/cars/bulk', methods=['POST'])
+def add_cars_bulk():
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    if isinstance(data, dict):
+        data = data.get("cars")
+    if not isinstance(data, list):
+        return {"error": "Expected a JSON array of cars"}, 400
+
+    failed = []
+    warnings = []
+    written = 0
+    batch = get_db().batch()
+    batch_size = 0
+    for i, row in enumerate(data):
+        if not isinstance(row, dict):
+            failed.append({"index": i, "errors": {"_": "not an object"}})
+            continue
+        car, errors = coerce_car(row)
+        if car is None:
+            failed.append({"index": i, "hack-id": row.get("hack-id"), "errors": errors})
+            continue
+        if errors:
+            warnings.append({"index": i, "hack-id": car["hack-id"], "errors": errors})
+
+        batch.set(get_db().collection("cars").document(car["hack-id"]), car)
+        batch_size += 1
+        if batch_size >= BULK_BATCH_SIZE:
+            with metrics.span("firestore", "cars.batch_commit"):
+                batch.commit()
+            written += batch_size
+            batch = get_db().batch()
+            batch_size = 0
+
+    if batch_size > 0:
+        with metrics.span("firestore", "cars.batch_commit"):
+            batch.commit()
+        written += batch_size
+    if written:
+        catalog_version.bump()
+
+    log.info("bulk car write", extra={"written": written, "rejected": len(failed)})
+    status = 200 if not failed else 207
+    return {"written": written, "failed": failed, "warnings": warnings}, status
@@ -0,0 +1,28 @@
+from flask import Blueprint, jsonify, request
+
+from rag_model import query_rag
+
+bp = Blueprint("chat", __name__)
+
+@bp.route("/ask", methods=["POST"])
+def ask():
+    data = request.get_json()
+    question = data.get("question", "")
+    if not question:
+        return jsonify({"error": "Missing question"}), 400
+
+    result = query_rag(question)
+    
+    # Format the response with hack_ids for hyperlinking
+    cars = []
+    for i, hack_id in enumerate(result["hack_ids"]):
+        cars.append({
+            "hack_id": hack_id,
+            "description": result["descriptions"][i],
+            "link": f"/car/{hack_id}"
+        })
+    
+    return jsonify({
+        "answer": result["answer"],
+        "relevant_cars": cars
+    })
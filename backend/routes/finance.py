@@ -0,0 +1,386 @@
+import logging
+import os
+
+import numpy as np
+from flask import Blueprint, request
+
+import catalog_arrays
+import http_client
+import trade_in
+from financing import financing_grid, max_affordable_price, attach_approval, ownership_costs, DEFAULT_TERMS_YEARS, DEFAULT_APRS
+from predict_loan import predict_loan_approval, cache_stats
+from ttl_cache import TTLCache
+
+COLLECT_API_KEY = os.getenv("COLLECT_API")
+MARKET_CHECK_API = os.getenv("MARKET_CHECK_API")
+
+bp = Blueprint("finance", __name__)
+log = logging.getLogger(__name__)
+
+# Gas prices barely move within an hour, so keep them per (city, state) and serve
+# stale values for a while longer while one background refresh runs
+GAS_PRICE_TTL = int(os.getenv("GAS_PRICE_TTL", "3600"))
+GAS_PRICE_STALE_TTL = int(os.getenv("GAS_PRICE_STALE_TTL", "21600"))
+gas_price_cache = TTLCache(ttl=GAS_PRICE_TTL, stale_ttl=GAS_PRICE_STALE_TTL, max_size=2048, name="gas-price")
+
+class GasPriceError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def bad_location(self):
+        # CollectAPI rejected the city/state itself; an old price for it won't exist or help
+        return self.status in (400, 404, 422)
+
+def fetch_gas_price(city, state):
+    """Fetch the gasoline price in USD per gallon from CollectAPI, parsing the response once."""
+    headers = {
+        "authorization": COLLECT_API_KEY,
+        "content-type": "application/json"
+    }
+
+    api_url = f'https://api.collectapi.com/gasPrice/fromCity?city={city}, {state}'
+    log.debug("calling gas price API", extra={"city": city, "state": state})
+
+    resp = http_client.get(api_url, headers=headers, hedge=True)
+    if resp.status_code != 200:
+        log.warning("gas price API error", extra={"status": resp.status_code})
+        raise GasPriceError("Failed to fetch gas price", status=resp.status_code)
+
+    result = resp.json()["result"]
+    if result["currency"] != "usd":
+        log.warning("gas price in unsupported currency", extra={"currency": result["currency"]})
+        raise GasPriceError("Unsupported currency")
+
+    price = float(result["gasoline"])
+    if result["unit"] == "liter":
+        price *= 3.78541178
+    return round(price, 2)
+
+
+@bp.route('/gas-price', methods=['GET'])
+def get_gas_price():
+    try:
+        city = request.args.get('city').lower()
+        state = request.args.get('state').lower()
+    except:
+        city = None
+        state = None
+
+    if city is None or state is None:
+        log.info("gas price request missing city or state")
+        return {"error": "No city, state pair provided"}, 404
+
+    try:
+        price, stale = cached_gas_price(city, state)
+    except GasPriceError as e:
+        if e.bad_location:
+            return {"error": "Unknown city, state pair"}, 400
+        return {"error": str(e)}, 500
+    except http_client.CircuitOpenError:
+        return {"error": "Gas price service temporarily unavailable"}, 503
+    except Exception:
+        return {"error": "Failed to fetch gas price"}, 500
+
+    if stale:
+        return {"price": price, "stale": True}, 200
+    return {"price": price}, 200
+
+
+def cached_gas_price(city, state):
+    """
+    (price, stale) for a city, from gas_price_cache. If the upstream fails (down,
+    5xx/429, circuit open), the last known price is returned with stale=True; with
+    none, or when the upstream rejects the city/state itself, the error is raised.
+    """
+    # Normalize city and state to lowercase for API compatibility
+    city_normalized = city.lower().strip()
+    state_normalized = state.lower().strip()
+
+    key = (city_normalized, state_normalized)
+    try:
+        return gas_price_cache.get_or_fetch(key, lambda: fetch_gas_price(city_normalized, state_normalized)), False
+    except Exception as e:
+        if isinstance(e, GasPriceError) and e.bad_location:
+            raise
+        # Upstream down, erroring or its circuit is open: an old price beats no price
+        stale_price = gas_price_cache.get_stale(key)
+        if stale_price is not None:
+            log.warning("gas price upstream unavailable, serving stale price",
+                        extra={"city": city_normalized, "state": state_normalized, "error": str(e)})
+            return stale_price, True
+        log.error("gas price lookup failed", extra={"city": city_normalized, "state": state_normalized, "error": str(e)})
+        raise
+
+
+@bp.route('/gas-price/cache', methods=['GET'])
+def gas_price_cache_stats():
+    return gas_price_cache.stats(), 200
+
+
+def fetch_trade_in_price_stats(key):
+    """Fetch MarketCheck sales price_stats for a normalized trade-in key."""
+    year, make, model, city, state = key
+    headers = {
+        "Accept": "application/json",
+    }
+    params = {
+        "api_key": MARKET_CHECK_API,
+        "ymm": f"{year}|{make}|{model}",
+        "city_state": f"{city}|{state}"
+    }
+    log.debug("calling MarketCheck", extra={"ymm": params["ymm"], "city_state": params["city_state"]})
+    resp = http_client.get('https://api.marketcheck.com/v2/sales/car', headers=headers, params=params, hedge=True)
+    resp.raise_for_status()
+    return resp.json()["price_stats"]
+
+
+@bp.route('/trade-in-value', methods=['POST'])
+def get_trade_in_value():
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    if data is None:
+        return {"error": "No data provided"}, 400
+
+    try:
+        year, make, model = data["year"], data["make"], data["model"]
+    except Exception as e:
+        log.info("trade-in request missing field", extra={"error": str(e)})
+        return {"error": "Missing data"}, 400
+
+    try:
+        city, state = data["city"], data["state-ac"]
+    except Exception as e:
+        city, state = "dallas", "TX"
+
+    try:
+        key = trade_in.normalize_key(year, make, model, city, state)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    value, source = trade_in.get_trade_in_value(key, fetch_trade_in_price_stats)
+    if value is None:
+        return {"error": "Failed to fetch trade-in value"}, 500
+
+    return {"trade-in-value": value, "source": source}, 200
+
+
+@bp.route('/trade-in-value/cache', methods=['GET'])
+def trade_in_cache_stats():
+    return trade_in.trade_in_cache.stats(), 200
+
+
+@bp.route('/predict/loan', methods=['POST'])
+def predict_loan():
+    try:
+        data = request.get_json()
+    except:
+        return {"error": "No data provided"}, 400
+    
+    log.debug("loan prediction request", extra={"body": data})
+
+    try:
+        # Extract quiz answers and car price - NO DEFAULTS, REQUIRE ALL VALUES
+        if "annualIncome" not in data or not data["annualIncome"]:
+            raise ValueError("annualIncome is required and cannot be empty")
+        if "creditScore" not in data or not data["creditScore"]:
+            raise ValueError("creditScore is required and cannot be empty")
+        if "loanAmount" not in data or not data["loanAmount"]:
+            raise ValueError("loanAmount is required and cannot be empty")
+        
+        income_annum = float(data["annualIncome"])
+        credit_score = int(data["creditScore"])
+        is_college_grad = 1 if data.get("isCollegeGrad") else 0
+        is_self_employed = 1 if data.get("isSelfEmployed") else 0
+        loan_amount = float(data["loanAmount"])  # Car MSRP
+        loan_term = int(data.get("loanTerm", 5))  # Default 5 years
+
+        # Make prediction
+        result = predict_loan_approval(
+            income_annum=income_annum,
+            loan_amount=loan_amount,
+            loan_term=loan_term,
+            cibil_score=credit_score,
+            education=is_college_grad,
+            self_employed=is_self_employed
+        )
+
+        log.info("loan prediction", extra={"approved": result["approved"], "probability": result["probability"],
+                                           "loan_amount": loan_amount, "loan_term": loan_term})
+        return result, 200
+    except Exception as e:
+        log.exception("loan prediction failed")
+        return {"error": str(e)}, 500
+
+
+@bp.route('/predict/loan/cache', methods=['GET'])
+def predict_loan_cache_stats():
+    return cache_stats(), 200
+
+
+@bp.route('/finance/grid', methods=['POST'])
+def finance_grid():
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    if data is None:
+        return {"error": "No data provided"}, 400
+
+    try:
+        cars = data["cars"]  # [{"hack_id": ..., "price": ...}]
+        hack_ids = [car.get("hack_id") for car in cars]
+        prices = [float(car["price"]) for car in cars]
+        terms = [float(t) for t in data.get("terms", DEFAULT_TERMS_YEARS)]
+        aprs = [float(r) for r in data.get("aprs", DEFAULT_APRS)]
+        down_payment = float(data.get("downPayment", 0) or 0)
+        applicant = None
+        if data.get("annualIncome") and data.get("creditScore"):
+            applicant = (float(data["annualIncome"]), int(data["creditScore"]))
+        monthly_budget = float(data["monthlyBudget"]) if data.get("monthlyBudget") else None
+    except Exception as e:
+        log.info("finance grid bad request", extra={"error": str(e)})
+        return {"error": "Missing data"}, 400
+
+    if not terms or not aprs or any(t <= 0 for t in terms):
+        return {"error": "terms and aprs must be non-empty and terms positive"}, 400
+    # NaN slips through every comparison below, and "1e400" parses to inf
+    numbers = [*prices, *terms, *aprs, down_payment, *(applicant or ()),
+               *(() if monthly_budget is None else (monthly_budget,))]
+    if not all(np.isfinite(numbers)):
+        return {"error": "prices, terms, aprs, downPayment, annualIncome and monthlyBudget must be finite numbers"}, 400
+    if any(p < 0 for p in prices) or any(r < 0 for r in aprs) or down_payment < 0:
+        return {"error": "prices, aprs and downPayment must be >= 0"}, 400
+
+    grid = financing_grid(prices, terms, aprs, down_payment)
+
+    approval = None
+    if applicant is not None:
+        approval = attach_approval(
+            [max(p - down_payment, 0.0) for p in prices],
+            terms,
+            income_annum=applicant[0],
+            cibil_score=applicant[1],
+            education=1 if data.get("isCollegeGrad") else 0,
+            self_employed=1 if data.get("isSelfEmployed") else 0
+        ).round(3)
+
+    monthly_payment = grid["monthly_payment"].round(2)
+    total_interest = grid["total_interest"].round(2)
+    results = []
+    for i, hack_id in enumerate(hack_ids):
+        row = {
+            "hack_id": hack_id,
+            "price": prices[i],
+            "monthly_payment": monthly_payment[i].tolist(),  # [term][apr]
+            "total_interest": total_interest[i].tolist(),
+        }
+        if approval is not None:
+            row["approval_probability"] = approval[i].tolist()  # [term]
+        results.append(row)
+
+    response = {"terms": terms, "aprs": aprs, "down_payment": down_payment, "cars": results}
+    if monthly_budget is not None:
+        response["max_affordable_price"] = max_affordable_price(
+            monthly_budget, terms, aprs, down_payment
+        ).round(2).tolist()
+    return response, 200
+
+
+# Used when the regional gas price can't be fetched and nothing is cached
+DEFAULT_GAS_PRICE = float(os.getenv("DEFAULT_GAS_PRICE", "3.50"))
+# USD per kWh; there is no regional electricity price source yet
+ELECTRICITY_PRICE = float(os.getenv("ELECTRICITY_PRICE", "0.17"))
+TCO_PAGE_SIZE = 16
+TCO_MAX_PAGE_SIZE = 100
+TCO_CAR_FIELDS = ("year", "make", "model", "trim", "type", "img_path")
+
+@bp.route('/finance/tco', methods=['POST'])
+def total_cost_of_ownership():
+    """
+    Rank the whole catalog by fuel/charging plus depreciation over a horizon:
+    {"milesPerWeek": 150, "city": ..., "state": ..., "years": 3, "page": 1}
+    """
+    try:
+        data = request.get_json()
+    except:
+        data = None
+
+    if data is None:
+        return {"error": "No data provided"}, 400
+
+    try:
+        miles_per_week = float(data["milesPerWeek"])
+        years = float(data.get("years", 3))
+        page = max(int(data.get("page", 1)), 1)
+        page_size = min(max(int(data.get("pageSize", TCO_PAGE_SIZE)), 1), TCO_MAX_PAGE_SIZE)
+        electricity_price = float(data.get("electricityPrice", ELECTRICITY_PRICE))
+    except Exception as e:
+        log.info("tco bad request", extra={"error": str(e)})
+        return {"error": "Missing data"}, 400
+    # NaN slips through every comparison below, so check finiteness first
+    if not all(np.isfinite((miles_per_week, years, electricity_price))):
+        return {"error": "milesPerWeek, years and electricityPrice must be finite numbers"}, 400
+    if miles_per_week < 0 or not 0 < years <= 30 or electricity_price < 0:
+        return {"error": "milesPerWeek and electricityPrice must be >= 0 and years in (0, 30]"}, 400
+
+    gas_price_source = "default"
+    gas_price = DEFAULT_GAS_PRICE
+    if data.get("city") and data.get("state"):
+        try:
+            gas_price, stale = cached_gas_price(str(data["city"]), str(data["state"]))
+            gas_price_source = "stale" if stale else "live"
+        except Exception:
+            pass  # cached_gas_price already logged it; rank with the default price
+
+    catalog = catalog_arrays.snapshot()
+    numbers = catalog.numbers
+    # Some trims only have city/highway ratings
+    mpg = np.where(numbers["combined_mpg"] > 0, numbers["combined_mpg"],
+                   (numbers["epa_city_mpg"] + numbers["epa_highway_mpg"]) / 2)
+    costs = ownership_costs(
+        numbers["estimated_current_cost"], numbers["expected_value_2027"], mpg,
+        numbers["epa_kwh_100_mi_electric"], numbers["range_electric"],
+        miles_per_week, years, gas_price, electricity_price
+    )
+
+    total_cost = costs["total_cost"]
+    ranked = np.flatnonzero(np.isfinite(total_cost))
+    ranked = ranked[np.argsort(total_cost[ranked], kind="stable")]
+    total_pages = (len(ranked) + page_size - 1) // page_size
+
+    cars = []
+    for i in ranked[(page - 1) * page_size:page * page_size]:
+        row = {"hack_id": catalog.hack_ids[i]}
+        for field in TCO_CAR_FIELDS:
+            if field in numbers:
+                row[field] = int(numbers[field][i]) if np.isfinite(numbers[field][i]) else None
+            else:
+                row[field] = catalog.text[field][i]
+        # cost_per_mile is NaN at 0 miles/week; a bare NaN isn't valid JSON
+        row.update({name: round(float(values[i]), 3 if name == "cost_per_mile" else 2)
+                    if np.isfinite(values[i]) else None for name, values in costs.items()})
+        cars.append(row)
+
+    return {
+        "assumptions": {
+            "miles_per_week": miles_per_week,
+            "years": years,
+            "gas_price": gas_price,
+            "gas_price_source": gas_price_source,
+            "electricity_price": electricity_price,
+        },
+        "cars": cars,
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total_cars": len(ranked),
+            "total_pages": total_pages,
+            "has_next": page < total_pages,
+            "has_prev": page > 1
+        }
+    }, 200
@@ -0,0 +1,118 @@
+import logging
+import os
+import uuid
+from pathlib import Path
+
+from flask import Blueprint, send_from_directory
+
+import http_client
+import metrics
+
+SERP_API_KEY = os.getenv("SERP_API_KEY")
+IMAGES_DIR = os.getenv("IMAGES_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "images"))
+
+# Ensure images directory exists
+Path(IMAGES_DIR).mkdir(exist_ok=True)
+
+bp = Blueprint("images", __name__)
+log = logging.getLogger(__name__)
+
+@bp.route("/images/<filename>")
+def serve_image(filename):
+    return send_from_directory(IMAGES_DIR, filename)
+
+def download_image(image_url, hack_id):
+    """Download image from URL and save it with a unique filename"""
+    try:
+        # Add headers to mimic a browser request
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Referer': 'https://www.google.com/',
+            'Sec-Fetch-Dest': 'image',
+            'Sec-Fetch-Mode': 'no-cors',
+            'Sec-Fetch-Site': 'cross-site',
+        }
+        
+        # Scraped URLs point anywhere, so don't keep a pool or a metrics series per CDN host
+        with http_client.get(image_url, headers=headers, timeout=10, stream=True, allow_redirects=True,
+                             pooled=False) as response:
+            response.raise_for_status()
+        
+            # Verify content type is an image
+            content_type = response.headers.get('content-type', '')
+            if 'image' not in content_type.lower():
+                log.info("not an image", extra={"hack_id": hack_id, "content_type": content_type})
+                return None
+        
+            # Generate unique filename
+            file_extension = image_url.split('.')[-1].split('?')[0].lower()
+            if file_extension not in ['jpg', 'jpeg', 'png', 'webp', 'gif']:
+                # Try to get extension from content-type
+                if 'jpeg' in content_type or 'jpg' in content_type:
+                    file_extension = 'jpg'
+                elif 'png' in content_type:
+                    file_extension = 'png'
+                elif 'webp' in content_type:
+                    file_extension = 'webp'
+                else:
+                    file_extension = 'jpg'
+        
+            filename = f"{uuid.uuid4().hex}.{file_extension}"
+            filepath = os.path.join(IMAGES_DIR, filename)
+        
+            # Save image
+            with open(filepath, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+        
+        log.debug("downloaded image", extra={"hack_id": hack_id})
+        return filename
+    except Exception as e:
+        # Don't log common 403s
+        if '403' in str(e):
+            return None
+        log.info("image download failed", extra={"hack_id": hack_id, "error": str(e)})
+        return None
+
+def fetch_and_save_image(hack_id, doc_ref):
+    """Fetch image from SERP API and save it"""
+    try:
+        # Call SERP API for Google Image Search
+        serp_url = "https://serpapi.com/search"
+        params = {
+            "engine": "google_images",
+            "q": hack_id,
+            "api_key": SERP_API_KEY,
+            "num": 5  # Get 5 results to have more fallback options
+        }
+        
+        response = http_client.get(serp_url, params=params, timeout=10, hedge=True)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Try multiple image results in case first one fails
+        if "images_results" in data and len(data["images_results"]) > 0:
+            for i, result in enumerate(data["images_results"][:5]):
+                # Try thumbnail first (usually more reliable), then original
+                for url_key in ['thumbnail', 'original']:
+                    image_url = result.get(url_key)
+                    
+                    if image_url:
+                        # Try to download and save image
+                        filename = download_image(image_url, hack_id)
+                        
+                        if filename:
+                            # Update Firestore with img_path
+                            with metrics.span("firestore", "cars.update_img_path"):
+                                doc_ref.update({"img_path": filename})
+                            return filename
+            
+            log.info("no candidate image downloaded", extra={"hack_id": hack_id, "tried": i + 1})
+
+        log.info("no valid images found", extra={"hack_id": hack_id})
+        return None
+    except Exception as e:
+        log.warning("image search failed", extra={"hack_id": hack_id, "error": str(e)})
+        return None
@@ -0,0 +1,43 @@
+from flask import Blueprint, request
+
+import recommender
+
+bp = Blueprint("recommendations", __name__)
+
+FEED_MAX = 50
+
+
+@bp.route('/recommendations/feed', methods=['POST'])
+def recommendation_feed():
+    """
+    {"session_id": ..., "events": [{"hack_id": ..., "action": "like" | "pass"}], "limit": 10}
+    -> {"session_id": ..., "cars": [{"hack_id": ..., "score": ...}]}
+
+    Send only the swipes made since the last call. Leave session_id out on the
+    first call and reuse the one returned.
+    """
+    try:
+        data = request.get_json()
+    except:
+        data = None
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
+
+    session_id = data.get("session_id")
+    events = data.get("events") or []
+    if session_id is not None and not isinstance(session_id, str):
+        return {"error": "session_id must be a string"}, 400
+    if not isinstance(events, list) or not all(isinstance(e, dict) for e in events):
+        return {"error": "events must be a list of {\"hack_id\", \"action\"} objects"}, 400
+    try:
+        limit = max(1, min(int(data.get("limit", 10)), FEED_MAX))
+    except (TypeError, ValueError):
+        return {"error": "Invalid limit"}, 400
+
+    session_id, picks = recommender.feed(session_id, events, limit)
+    return {
+        "session_id": session_id,
+        "cars": [{"hack_id": hack_id, "score": score} for hack_id, score in picks],
+    }, 200
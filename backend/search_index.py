@@ -0,0 +1,117 @@
+"""
+Typo-tolerant autocomplete over the catalog.
+
+Every car is tokenized from its hack-id, model, trim, submodel and description.
+The index keeps the sorted vocabulary for prefix lookups (bisect) and a trigram
+-> token map for misspellings. A query token matches a car through the best of:
+
+- the exact token (1.0)
+- a token it is a prefix of (0.8), so "tac" finds "tacoma"
+- a token sharing enough trigrams (up to 0.6 x similarity), so "camery" finds "camry"
+
+The match is scaled by the weight of the field it was found in. Cars matching
+more query tokens rank first, then by total score. Each query token expands to at
+most MAX_EXPANSIONS vocabulary tokens, and a query stops early once it has used
+SUGGEST_BUDGET_MS.
+
+The index is built from catalog_arrays' snapshot, once per catalog version.
+"""
+import bisect
+import os
+import re
+import time
+from collections import defaultdict
+
+import catalog_arrays
+
+FIELD_WEIGHTS = {"model": 3.0, "trim": 2.0, "submodel": 1.5, "hack-id": 1.0, "description": 1.0}
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+MIN_SIMILARITY = 0.4
+MAX_EXPANSIONS = 50
+MAX_QUERY_TOKENS = 8
+# Query tokens left once this is spent are skipped and the result is marked partial
+SUGGEST_BUDGET_MS = float(os.getenv("SUGGEST_BUDGET_MS", "25"))
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, snap):
+        postings = defaultdict(dict)  # token -> {car row: best field weight}
+        for field, weight in FIELD_WEIGHTS.items():
+            values = snap.hack_ids if field == "hack-id" else snap.text[field]
+            for row, value in enumerate(values):
+                for token in tokenize(value):
+                    if postings[token].get(row, 0) < weight:
+                        postings[token][row] = weight
+        self.postings = dict(postings)
+        self.vocabulary = sorted(self.postings)
+        self.trigrams = defaultdict(list)
+        for token in self.vocabulary:
+            for gram in _trigrams(token):
+                self.trigrams[gram].append(token)
+        self.trigrams = dict(self.trigrams)
+
+    def _expand(self, token):
+        """{vocabulary token: match strength} for one query token."""
+        matches = {}
+        if token in self.postings:
+            matches[token] = EXACT
+        start = bisect.bisect_left(self.vocabulary, token)
+        for candidate in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not candidate.startswith(token):
+                break
+            matches.setdefault(candidate, PREFIX)
+        if matches or len(token) < 3:
+            return matches
+
+        grams = _trigrams(token)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self.trigrams.get(gram, ()):
+                shared[candidate] += 1
+        scored = []
+        for candidate, count in shared.items():
+            # Dice coefficient over trigram sets
+            similarity = 2 * count / (len(grams) + len(_trigrams(candidate)))
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, candidate))
+        for similarity, candidate in sorted(scored, reverse=True)[:MAX_EXPANSIONS]:
+            matches[candidate] = FUZZY * similarity
+        return matches
+
+    def search(self, query, limit=10, budget_ms=SUGGEST_BUDGET_MS):
+        """([(car row, score), ...] best first, True if every query token was used)."""
+        deadline = time.perf_counter() + budget_ms / 1000
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+        matched = defaultdict(int)
+        scores = defaultdict(float)
+        complete = True
+        for token in tokens:
+            if time.perf_counter() > deadline:
+                complete = False
+                break
+            best = {}
+            for candidate, strength in self._expand(token).items():
+                for row, weight in self.postings[candidate].items():
+                    score = strength * weight
+                    if score > best.get(row, 0):
+                        best[row] = score
+            for row, score in best.items():
+                matched[row] += 1
+                scores[row] += score
+        ranked = sorted(scores, key=lambda row: (-matched[row], -scores[row], row))
+        return [(row, round(scores[row], 3)) for row in ranked[:limit]], complete
+
+
+def index(snap):
+    return catalog_arrays.derived(snap, "search", SearchIndex)
@@ -0,0 +1,53 @@
+"""
+Serve the neighbour table written by build_neighbors.py.
+
+The table is loaded on first use and re-read when the file changes on disk, so
+a rebuilt table is picked up without a restart. Lookups are a dict hit plus a
+slice of the precomputed rows.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+from build_neighbors import NEIGHBORS_PATH
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_table = None  # (mtime_ns, hack_ids, {hack_id: row}, indices, scores)
+
+
+class NoTable(RuntimeError):
+    pass
+
+
+def _load():
+    global _table
+    try:
+        mtime = os.stat(NEIGHBORS_PATH).st_mtime_ns
+    except OSError:
+        raise NoTable(f"{NEIGHBORS_PATH} not found; run build_neighbors.py")
+    if _table is not None and _table[0] == mtime:
+        return _table
+    with _lock:
+        if _table is None or _table[0] != mtime:
+            with np.load(NEIGHBORS_PATH) as data:
+                hack_ids = data["hack_ids"].tolist()
+                _table = (mtime, hack_ids, {h: i for i, h in enumerate(hack_ids)},
+                          data["indices"], data["scores"])
+            log.info("neighbour table loaded", extra={"cars": len(hack_ids), "k": _table[3].shape[1]})
+        return _table
+
+
+def similar(hack_id, k=10):
+    """
+    [(hack_id, score), ...] for the k most similar cars, best first, or None if
+    the car isn't in the table.
+    """
+    _, hack_ids, rows, indices, scores = _load()
+    row = rows.get(hack_id)
+    if row is None:
+        return None
+    return [(hack_ids[j], round(float(s), 4)) for j, s in zip(indices[row, :k], scores[row, :k])]
@@ -0,0 +1,158 @@
+"""
+Sync the cars collection with a catalog CSV, writing only what changed.
+
+Each car's content hash (sha256 of its schema-coerced fields, img_path left
+out) is stored on its document as `content_hash`. A sync reads just those
+hashes back, diffs them against the CSV, and sends the inserts, updates and
+deletes through a BulkWriter. Updates merge into the existing document, so an
+img_path the API already backfilled survives, and a doc written without a hash
+(uploadcsv.py, the bulk endpoint) is rewritten once to get one. The catalog
+version is bumped after any write, which invalidates API caches.
+
+    python3 sync_catalog.py --dry-run
+    python3 sync_catalog.py -f data/car_data_processed.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import catalog_version
+from car_schema import read_car_csv
+from database import get_db
+
+DEFAULT_FILE = os.path.join("data", "car_data_processed.csv")
+HASH_FIELD = "content_hash"
+# Set by the API when it fetches an image, not by the CSV
+PRESERVED_FIELDS = ("img_path",)
+
+
+def content_hash(car):
+    content = {k: v for k, v in car.items() if k not in PRESERVED_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:32]
+
+
+def read_catalog(path):
+    """
+    ({hack-id: car}, invalid rows, coerced rows, duplicate hack-ids). Coerced rows
+    are synced with their unparseable numbers set to the field default, as the API
+    would store them. A repeated hack-id keeps its last row, as an upload would.
+    """
+    cars = {}
+    invalid = []
+    coerced = []
+    duplicates = 0
+    for line, car, errors in read_car_csv(path):
+        if car is None:
+            invalid.append((line, errors))
+            continue
+        if errors:
+            coerced.append((line, errors))
+        if car["hack-id"] in cars:
+            duplicates += 1
+        cars[car["hack-id"]] = car
+    return cars, invalid, coerced, duplicates
+
+
+def stored_hashes(db):
+    """{doc id: content hash or None} for every car, reading only the hash field."""
+    return {doc.id: (doc.to_dict() or {}).get(HASH_FIELD)
+            for doc in db.collection("cars").select([HASH_FIELD]).stream()}
+
+
+def diff(cars, hashes, delete_missing=True):
+    inserts, updates = [], []
+    for hack_id, car in cars.items():
+        if hack_id not in hashes:
+            inserts.append(hack_id)
+        elif hashes[hack_id] != content_hash(car):
+            updates.append(hack_id)
+    deletes = [hack_id for hack_id in hashes if hack_id not in cars] if delete_missing else []
+    return inserts, updates, deletes
+
+
+def apply(db, cars, inserts, updates, deletes):
+    """Write the change set with a BulkWriter; returns the number of failed writes."""
+    failed = []
+    writer = db.bulk_writer()
+
+    def on_error(error, _writer):
+        # Retry transient failures a few times, then give up on that document
+        if error.attempts < 3:
+            return True
+        failed.append(error)
+        print(f"[SYNC] write failed for {error.operation.reference.id}: {error.message}", file=sys.stderr)
+        return False
+
+    writer.on_write_error(on_error)
+    cars_ref = db.collection("cars")
+    for hack_id in inserts:
+        writer.set(cars_ref.document(hack_id), {**cars[hack_id], HASH_FIELD: content_hash(cars[hack_id])})
+    for hack_id in updates:
+        car = {k: v for k, v in cars[hack_id].items() if k not in PRESERVED_FIELDS}
+        writer.set(cars_ref.document(hack_id), {**car, HASH_FIELD: content_hash(cars[hack_id])}, merge=True)
+    for hack_id in deletes:
+        writer.delete(cars_ref.document(hack_id))
+    writer.close()
+    return len(failed)
+
+
+def _sample(ids, n=5):
+    return ", ".join(ids[:n]) + (f", ... (+{len(ids) - n})" if len(ids) > n else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write only the catalog changes from a CSV to Firestore.")
+    parser.add_argument("--file", "-f", default=DEFAULT_FILE, help="Catalog CSV")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Show the change set without writing")
+    parser.add_argument("--keep-missing", action="store_true", help="Don't delete cars that are not in the CSV")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.file):
+        print(f"CSV file not found: {args.file}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    cars, invalid, coerced, duplicates = read_catalog(args.file)
+    for line, errors in invalid:
+        print(f"[SYNC] row {line} skipped, invalid: {errors}", file=sys.stderr)
+    for line, errors in coerced:
+        print(f"[SYNC] row {line} has bad values, using field defaults: {errors}", file=sys.stderr)
+    if not cars:
+        # Almost certainly the wrong file; don't turn it into deleting the catalog
+        print("[SYNC] no valid cars in the CSV, nothing to sync", file=sys.stderr)
+        sys.exit(1)
+
+    delete_missing = not args.keep_missing
+    if invalid and delete_missing:
+        # An invalid row's car would look deleted from the CSV
+        print("[SYNC] CSV has invalid rows, not deleting anything this run", file=sys.stderr)
+        delete_missing = False
+
+    db = get_db()
+    hashes = stored_hashes(db)
+    inserts, updates, deletes = diff(cars, hashes, delete_missing=delete_missing)
+    unchanged = len(cars) - len(inserts) - len(updates)
+    print(f"[SYNC] {len(cars)} cars in CSV ({duplicates} duplicate rows, {len(invalid)} invalid, "
+          f"{len(coerced)} with bad values), "
+          f"{len(hashes)} in Firestore")
+    print(f"[SYNC] {len(inserts)} inserts, {len(updates)} updates, {len(deletes)} deletes, {unchanged} unchanged")
+    for label, ids in (("insert", inserts), ("update", updates), ("delete", deletes)):
+        if ids:
+            print(f"[SYNC]   {label}: {_sample(ids)}")
+
+    if args.dry_run or not (inserts or updates or deletes):
+        return
+
+    failed = apply(db, cars, inserts, updates, deletes)
+    catalog_version.bump()
+    elapsed = time.perf_counter() - start
+    print(f"[SYNC] wrote {len(inserts) + len(updates) + len(deletes) - failed} changes in {elapsed:.2f}s, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
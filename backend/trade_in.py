@@ -0,0 +1,319 @@
+import csv
+import datetime
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from ttl_cache import TTLCache
+
+log = logging.getLogger(__name__)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(BASE_DIR, "data", "trade_in_history.jsonl")
+CATALOG_PATH = os.path.join(BASE_DIR, "data", "car_data_processed.csv")
+
+# Same residual value curve data-processing-makes.py uses for the catalog (index = age in years)
+RESIDUAL_VALUE = [1, 0.84, 0.72, 0.61, 0.52, 0.45, 0.4275, 0.41]
+
+US_STATES = {
+    "Alabama": "AL",
+    "Alaska": "AK",
+    "Arizona": "AZ",
+    "Arkansas": "AR",
+    "California": "CA",
+    "Colorado": "CO",
+    "Connecticut": "CT",
+    "Delaware": "DE",
+    "Florida": "FL",
+    "Georgia": "GA",
+    "Hawaii": "HI",
+    "Idaho": "ID",
+    "Illinois": "IL",
+    "Indiana": "IN",
+    "Iowa": "IA",
+    "Kansas": "KS",
+    "Kentucky": "KY",
+    "Louisiana": "LA",
+    "Maine": "ME",
+    "Maryland": "MD",
+    "Massachusetts": "MA",
+    "Michigan": "MI",
+    "Minnesota": "MN",
+    "Mississippi": "MS",
+    "Missouri": "MO",
+    "Montana": "MT",
+    "Nebraska": "NE",
+    "Nevada": "NV",
+    "New Hampshire": "NH",
+    "New Jersey": "NJ",
+    "New Mexico": "NM",
+    "New York": "NY",
+    "North Carolina": "NC",
+    "North Dakota": "ND",
+    "Ohio": "OH",
+    "Oklahoma": "OK",
+    "Oregon": "OR",
+    "Pennsylvania": "PA",
+    "Rhode Island": "RI",
+    "South Carolina": "SC",
+    "South Dakota": "SD",
+    "Tennessee": "TN",
+    "Texas": "TX",
+    "Utah": "UT",
+    "Vermont": "VT",
+    "Virginia": "VA",
+    "Washington": "WA",
+    "West Virginia": "WV",
+    "Wisconsin": "WI",
+    "Wyoming": "WY"
+}
+
+TRADE_IN_TTL = int(os.getenv("TRADE_IN_TTL", "86400"))
+TRADE_IN_STALE_TTL = int(os.getenv("TRADE_IN_STALE_TTL", "604800"))
+# How long a request waits on MarketCheck before answering from the local model
+TRADE_IN_UPSTREAM_BUDGET = float(os.getenv("TRADE_IN_UPSTREAM_BUDGET", "1.5"))
+
+trade_in_cache = TTLCache(ttl=TRADE_IN_TTL, stale_ttl=TRADE_IN_STALE_TTL, max_size=4096, name="trade-in")
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="trade-in")
+
+
+def state_abbreviation(state):
+    """Full state name or abbreviation (any case) -> two-letter code."""
+    state = (state or "").strip()
+    return US_STATES.get(state.title(), state.upper())
+
+
+def _text(value, field):
+    # JSON numbers are fine (str() them), nulls and containers are not
+    if value is None or isinstance(value, (bool, dict, list)):
+        raise ValueError(f"invalid {field}")
+    value = str(value).strip()
+    if not value:
+        raise ValueError(f"missing {field}")
+    return value
+
+
+def normalize_key(year, make, model, city, state):
+    """Cache/history key for a trade-in lookup; raises ValueError on a bad field."""
+    try:
+        year = int(_text(year, "year"))
+    except ValueError:
+        raise ValueError("invalid year")
+    if not 1900 <= year <= datetime.date.today().year + 1:
+        raise ValueError("invalid year")
+    return (str(year), _text(make, "make").lower(), _text(model, "model").lower(),
+            _text(city, "city").lower(), state_abbreviation(_text(state, "state")))
+
+
+def _age(year):
+    return max(datetime.date.today().year - int(year), 0)
+
+
+def _residual(age):
+    return RESIDUAL_VALUE[min(age, len(RESIDUAL_VALUE) - 1)]
+
+
+class DepreciationModel:
+    """
+    Ridge regression on log(mean sale price) fitted from MarketCheck history.
+    The residual value curve is used as a fixed offset, so the fit only learns a
+    per make/model level, a per-state offset and a (shrunk) age correction on top
+    of it. Make/models with no history fall back to the catalog MSRP times the
+    residual curve, still adjusted by the state offset.
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.n_records = 0
+        self.coef = None
+        self.vehicles = {}
+        self.states = {}
+        self.catalog_msrp = {}
+
+    def load_catalog(self, path=CATALOG_PATH):
+        prices = {}
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        msrp = float(row["msrp"])
+                    except (TypeError, ValueError):
+                        continue
+                    prices.setdefault((row["make"].lower(), row["model"].lower()), []).append(msrp)
+        except OSError as e:
+            log.warning("could not read catalog", extra={"path": path, "error": str(e)})
+        self.catalog_msrp = {k: float(np.median(v)) for k, v in prices.items()}
+
+    def _row(self, age, vehicle, state):
+        x = np.zeros(2 + len(self.vehicles) + len(self.states))
+        x[0] = 1.0
+        x[1] = age
+        if vehicle in self.vehicles:
+            x[2 + self.vehicles[vehicle]] = 1.0
+        if state in self.states:
+            x[2 + len(self.vehicles) + self.states[state]] = 1.0
+        return x
+
+    def fit(self, records):
+        self.n_records = len(records)
+        if not records:
+            self.coef = None
+            return
+        self.vehicles = {v: i for i, v in enumerate(sorted({(r["make"], r["model"]) for r in records}))}
+        self.states = {s: i for i, s in enumerate(sorted({r["state"] for r in records}))}
+        X = np.array([self._row(_age(r["year"]), (r["make"], r["model"]), r["state"]) for r in records])
+        y = np.log([r["mean"] / _residual(_age(r["year"])) for r in records])
+        penalty = self.alpha * np.eye(X.shape[1])
+        penalty[0, 0] = 1e-6  # barely shrink the intercept
+        self.coef = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+    def predict(self, year, make, model, state):
+        age = _age(year)
+        vehicle = (make, model)
+        state_offset = 0.0
+        if self.coef is not None and state in self.states:
+            state_offset = self.coef[2 + len(self.vehicles) + self.states[state]]
+
+        if self.coef is not None and vehicle in self.vehicles:
+            return float(np.exp(self._row(age, vehicle, state) @ self.coef) * _residual(age))
+
+        msrp = self.catalog_msrp.get(vehicle)
+        if msrp is None:
+            if self.coef is None:
+                return None
+            # Unknown vehicle: average level for this age and state
+            return float(np.exp(self._row(age, None, state) @ self.coef) * _residual(age))
+        return float(msrp * _residual(age) * np.exp(state_offset))
+
+
+# The last fitted model. A refit builds a new DepreciationModel and swaps it in,
+# so requests never wait on (or see half of) a fit.
+_model = None
+_fit_lock = threading.Lock()
+_refit_lock = threading.Lock()
+_refit_scheduled = False
+_history_lock = threading.Lock()
+_history = None
+
+
+def _load_history():
+    global _history
+    if _history is None:
+        _history = []
+        if os.path.exists(HISTORY_PATH):
+            with open(HISTORY_PATH, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        _history.append(json.loads(line))
+                    except ValueError:
+                        continue
+    return _history
+
+
+def record_price_stats(key, price_stats):
+    """Append a MarketCheck price_stats result to the on-disk history."""
+    year, make, model, city, state = key
+    record = {
+        "year": year, "make": make, "model": model, "city": city, "state": state,
+        "mean": price_stats["mean"],
+        "price_stats": price_stats,
+        "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    with _history_lock:
+        _load_history().append(record)
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        with open(HISTORY_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    _schedule_refit()
+
+
+def _fit_model():
+    """Fit a model on the current history and publish it. Callers hold _fit_lock."""
+    global _model
+    with _history_lock:
+        records = [r for r in _load_history() if r.get("mean")]
+    model = DepreciationModel()
+    if _model is not None:
+        model.catalog_msrp = _model.catalog_msrp
+    else:
+        model.load_catalog()
+    model.fit(records)
+    _model = model
+    return model
+
+
+def _refit():
+    global _refit_scheduled
+    with _refit_lock:
+        # Cleared before fitting, so history that lands mid-fit schedules another one
+        _refit_scheduled = False
+    try:
+        with _fit_lock:
+            _fit_model()
+    except Exception:
+        log.exception("trade-in model refit failed")
+
+
+def _schedule_refit():
+    """Refit on the executor after new history, at most one pending at a time."""
+    global _refit_scheduled
+    with _refit_lock:
+        if _refit_scheduled:
+            return
+        _refit_scheduled = True
+    _executor.submit(_refit)
+
+
+def model_estimate(key):
+    """Trade-in estimate from the last fitted model (fitted here only on first use)."""
+    year, make, model, _city, state = key
+    fitted = _model
+    if fitted is None:
+        with _fit_lock:
+            fitted = _model or _fit_model()
+    estimate = fitted.predict(year, make, model, state)
+    return round(estimate, 2) if estimate is not None else None
+
+
+def get_trade_in_value(key, fetch_upstream):
+    """
+    Resolve a trade-in value for a normalized key.
+
+    `fetch_upstream(key)` must return MarketCheck's price_stats dict. A fresh or
+    stale cache entry is returned immediately. On a miss the upstream call runs in
+    the background; if it doesn't finish within TRADE_IN_UPSTREAM_BUDGET the local
+    model answers and the upstream result lands in the cache when it arrives. If
+    the upstream fails outright, an expired cache entry is used before the model.
+
+    Returns:
+        (value, source) where source is "marketcheck", "cache" or "model",
+        or (None, None) if nothing could produce a value.
+    """
+    def fetch():
+        price_stats = fetch_upstream(key)
+        record_price_stats(key, price_stats)
+        return price_stats["mean"]
+
+    if trade_in_cache.peek(key) is not None:
+        return trade_in_cache.get_or_fetch(key, fetch), "cache"
+
+    future = _executor.submit(trade_in_cache.get_or_fetch, key, fetch)
+    try:
+        return future.result(timeout=TRADE_IN_UPSTREAM_BUDGET), "marketcheck"
+    except FutureTimeoutError:
+        log.info("upstream slower than budget, answering from model",
+                 extra={"budget_s": TRADE_IN_UPSTREAM_BUDGET, "key": "|".join(key)})
+    except Exception as e:
+        log.warning("upstream failed", extra={"key": "|".join(key), "error": str(e)})
+        # Upstream down or its circuit is open: prefer an expired real quote over the model
+        stale = trade_in_cache.get_stale(key)
+        if stale is not None:
+            return stale, "cache"
+
+    estimate = model_estimate(key)
+    if estimate is None:
+        return None, None
+    return estimate, "model"
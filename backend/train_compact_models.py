@@ -0,0 +1,175 @@
+"""
+Train compact candidate loan models and compare them against the full forest.
+
+Each candidate is trained on the same features as save_model.py, then
+benchmarked for held-out accuracy, pickled artifact size and p99 single-row
+predict latency. Compact tiers are saved as loan_model_<tier>.pkl so
+predict_loan.py can pick one with LOAN_MODEL_TIER. The full tier is only
+benchmarked here; its artifact (loan_model.pkl) is still owned by save_model.py.
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "data", "data.csv")
+REPORT_PATH = os.path.join(BASE_DIR, "loan_model_report.json")
+
+
+def load_training_data():
+    """Load data.csv with the same cleaning and dummy encoding as save_model.py."""
+    loan_original = pd.read_csv(DATA_PATH)
+    loan_original.columns = loan_original.columns.str.replace(' ', '')
+    loan = loan_original.drop(['loan_id'], axis=1)
+
+    loan_dummies = pd.get_dummies(loan)
+    loan_dummies.rename(columns = {
+        'education_ Graduate':'education',
+        'self_employed_ Yes':'self_employed',
+        'loan_status_ Approved':'loan_status'
+    }, inplace = True)
+    loan_dummies = loan_dummies.drop(['education_ Not Graduate', 'self_employed_ No', 'loan_status_ Rejected'], axis=1)
+
+    y = loan_dummies['loan_status']
+    X = loan_dummies.drop(['loan_status'], axis=1)
+    return X, y
+
+
+def candidate_models():
+    """Return {tier: unfitted estimator}. "full" mirrors save_model.py exactly."""
+    return {
+        "full": RandomForestClassifier(
+            n_estimators=150,
+            max_depth=None,
+            min_samples_leaf=1,
+            min_samples_split=5,
+            random_state=0
+        ),
+        "shallow_forest": RandomForestClassifier(
+            n_estimators=25,
+            max_depth=8,
+            min_samples_leaf=5,
+            random_state=0
+        ),
+        "boosted_stumps": GradientBoostingClassifier(
+            n_estimators=100,
+            max_depth=1,
+            learning_rate=0.3,
+            random_state=0
+        ),
+        "logistic": CalibratedClassifierCV(
+            make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)),
+            method="sigmoid",
+            cv=3
+        ),
+    }
+
+
+def measure_latency(model, X_test, rounds=500):
+    """Time predict_proba on single-row frames, the way predict_loan_approval calls it."""
+    rows = [X_test.iloc[[i % len(X_test)]] for i in range(rounds)]
+    model.predict_proba(rows[0])  # warm up
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p99_ms": round(float(np.percentile(timings, 99)), 4),
+    }
+
+
+def benchmark(test_size=0.2, rounds=500):
+    X, y = load_training_data()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=0, stratify=y
+    )
+
+    results = []
+    fitted = {}
+    for tier, model in candidate_models().items():
+        print(f"[TRAIN] Fitting {tier}...")
+        model.fit(X_train, y_train)
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+        size_bytes = len(pickle.dumps(model))
+        latency = measure_latency(model, X_test, rounds=rounds)
+        results.append({
+            "tier": tier,
+            "accuracy": round(float(accuracy), 4),
+            "size_bytes": size_bytes,
+            **latency,
+        })
+        fitted[tier] = model
+        print(f"[TRAIN] {tier}: accuracy={accuracy:.4f} size={size_bytes}B p99={latency['p99_ms']}ms")
+
+    return results, fitted, list(X.columns)
+
+
+def pick_tier(results, budget_ms):
+    """Most accurate tier whose p99 fits the budget, or None if nothing fits."""
+    within = [r for r in results if r["p99_ms"] <= budget_ms]
+    if not within:
+        return None
+    return max(within, key=lambda r: (r["accuracy"], -r["p99_ms"]))["tier"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and benchmark compact loan model tiers.")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="p99 single-row latency budget in ms")
+    parser.add_argument("--rounds", type=int, default=500, help="Single-row predictions timed per model")
+    parser.add_argument("--report", default=REPORT_PATH, help="Where to write the JSON report")
+    parser.add_argument("--no-save", action="store_true", help="Benchmark only, don't write tier artifacts")
+    args = parser.parse_args()
+
+    results, fitted, feature_names = benchmark(rounds=args.rounds)
+
+    if not args.no_save:
+        # Compact tiers are refit on all rows, same as save_model.py does for the full forest
+        X, y = load_training_data()
+        for tier, model in fitted.items():
+            if tier == "full":
+                continue
+            model.fit(X, y)
+            path = os.path.join(BASE_DIR, f"loan_model_{tier}.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(model, f)
+            print(f"[TRAIN] Saved {tier} to {path}")
+
+    recommended = pick_tier(results, args.budget_ms)
+    report = {
+        "budget_ms": args.budget_ms,
+        "recommended_tier": recommended,
+        "feature_names": feature_names,
+        "results": results,
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print(f"{'tier':<16}{'accuracy':>10}{'size (KB)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for r in results:
+        print(f"{r['tier']:<16}{r['accuracy']:>10.4f}{r['size_bytes'] / 1024:>12.1f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+    print()
+    if recommended:
+        print(f"Recommended tier for a {args.budget_ms}ms p99 budget: {recommended}")
+        print(f"Set LOAN_MODEL_TIER={recommended} to serve it.")
+    else:
+        print(f"No tier fits a {args.budget_ms}ms p99 budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class _Flight:
+    """One in-progress fetch that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe TTL cache with stale-while-revalidate and single-flight fetches.
+
+    - Entries younger than `ttl` seconds are returned as-is.
+    - Entries older than `ttl` but younger than `ttl + stale_ttl` are returned
+      immediately while one background thread refreshes them.
+    - On a miss, only the first caller runs `fetch`; concurrent callers for the
+      same key block on that call and share its result (or its exception).
+    Failed fetches are never cached.
+    """
+
+    def __init__(self, ttl, stale_ttl=0, max_size=1024, name="cache"):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.name = name
+        self._entries = {}  # key -> (value, stored_at)
+        self._flights = {}  # key -> _Flight
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for `key`, calling `fetch()` when it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._stats["hits"] += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._stats["stale_hits"] += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        self._stats["refreshes"] += 1
+                        threading.Thread(target=self._run, args=(key, fetch, flight), daemon=True).start()
+                    return value
+
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+                owner = True
+            else:
+                self._stats["coalesced"] += 1
+                owner = False
+
+        if owner:
+            self._run(key, fetch, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def peek(self, key):
+        """Value for `key` if get_or_fetch would return it without blocking, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl + self.stale_ttl:
+            return None
+        return entry[0]
+
+    def get_stale(self, key):
+        """Last stored value for `key` regardless of age, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "in_flight": len(self._flights)}
+
+    def _run(self, key, fetch, flight):
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            if flight.error is None:
+                self._store(key, flight.value)
+            else:
+                self._stats["errors"] += 1
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def _store(self, key, value):
+        # Re-insert so dict order stays oldest-first, then drop the oldest if over size
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        if len(self._entries) > self.max_size:
+            del self._entries[next(iter(self._entries))]
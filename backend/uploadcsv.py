@@ -1,38 +1,142 @@
 # python
+"""
+Upload catalog CSV rows to the API.
+
+Rows are posted concurrently by --workers threads over one pooled session, one
+car per POST /data/cars, or --batch-size cars per POST /data/cars/bulk. Each
+row's outcome is appended to a progress file, and a rerun skips the rows already
+uploaded, so an interrupted or partly failed load only retries what is left.
+Rows that fail (locally invalid, rejected by the server, or out of retries) go
+to a failure report instead of stopping the run.
+"""
 import csv
 import argparse
+import json
 import time
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from car_schema import coerce_car
 
 DEFAULT_FILE = os.path.join("data", "car_data_processed.csv")
 DEFAULT_URL = "http://127.0.0.1:5001/data/cars"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# A plain session, not http_client's: its circuit breaker would turn a brief API
+# hiccup into every remaining batch failing fast
+_session = requests.Session()
+
+
+def _size_pool(workers: int):
+    adapter = HTTPAdapter(pool_maxsize=max(1, workers))
+    _session.mount("http://", adapter)
+    _session.mount("https://", adapter)
 
 
-def post_row(url: str, row: dict, retries: int = 3, timeout: float = 5.0) -> requests.Response:
+def post_json(url: str, body, retries: int = 3, timeout: float = 5.0) -> requests.Response:
+    """POST with retries on connection errors and retryable statuses; writes are keyed by hack-id, so repeats are safe."""
     last_exc = None
     for attempt in range(1, retries + 1):
         try:
-            resp = requests.post(url, json=row, timeout=timeout)
-            return resp
+            resp = _session.post(url, json=body, timeout=timeout)
+            if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                return resp
         except requests.RequestException as exc:
             last_exc = exc
-            time.sleep(2 ** (attempt - 1))
+            if attempt == retries:
+                raise
+        time.sleep(2 ** (attempt - 1))
     raise last_exc
 
 
+def _error_text(resp: requests.Response) -> str:
+    try:
+        body = resp.text
+    except Exception:
+        body = "<could not read response body>"
+    return f"HTTP {resp.status_code}: {body[:500]}"
+
+
+def upload_row(url: str, item, retries: int, timeout: float):
+    """[(line, status, error)] for one row."""
+    line, row = item
+    try:
+        resp = post_json(url, row, retries=retries, timeout=timeout)
+    except Exception as e:
+        return [(line, "failed", f"Exception while posting: {e}")]
+    if not resp.ok:
+        return [(line, "failed", _error_text(resp))]
+    return [(line, "ok", None)]
+
+
+def upload_batch(url: str, items, retries: int, timeout: float):
+    """[(line, status, error)] for a batch sent to the bulk endpoint."""
+    try:
+        resp = post_json(url, {"cars": [row for _, row in items]}, retries=retries, timeout=timeout)
+    except Exception as e:
+        return [(line, "failed", f"Exception while posting: {e}") for line, _ in items]
+    if resp.status_code not in (200, 207):
+        error = _error_text(resp)
+        return [(line, "failed", error) for line, _ in items]
+    try:
+        rejected = {entry["index"]: entry.get("errors") for entry in resp.json().get("failed", [])}
+    except (ValueError, AttributeError, KeyError, TypeError):
+        return [(line, "failed", f"Unreadable bulk response: {_error_text(resp)}") for line, _ in items]
+    return [(line, "failed", f"Rejected: {json.dumps(rejected[i])}") if i in rejected else (line, "ok", None)
+            for i, (line, _) in enumerate(items)]
+
+
+def read_progress(path: str) -> dict:
+    """{line: hack-id} of rows a previous run uploaded."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as fh:
+        for entry in fh:
+            try:
+                entry = json.loads(entry)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if entry.get("status") == "ok":
+                done[entry["line"]] = entry.get("hack-id")
+            else:
+                done.pop(entry["line"], None)
+    return done
+
+
 def main():
     parser = argparse.ArgumentParser(description="Upload CSV rows as JSON to an API.")
     parser.add_argument("--file", "-f", default=DEFAULT_FILE, help="Path to CSV file")
     parser.add_argument("--url", "-u", default=DEFAULT_URL, help="Destination POST URL")
     parser.add_argument("--retries", "-r", type=int, default=3, help="Retries per row on failure")
+    parser.add_argument("--workers", "-w", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--batch-size", "-b", type=int, default=0,
+                        help="Cars per request to the bulk endpoint (default: one car per request)")
+    parser.add_argument("--bulk-url", help="Bulk endpoint for --batch-size (default: <url>/bulk)")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds per request (default 5, 30 in batch mode)")
+    parser.add_argument("--progress", help="Progress file (default: <file>.progress.jsonl)")
+    parser.add_argument("--report", help="Failure report (default: <file>.failures.csv)")
+    parser.add_argument("--restart", action="store_true", help="Ignore earlier progress and upload every row")
     args = parser.parse_args()
 
     if not os.path.isfile(args.file):
         print(f"CSV file not found: {args.file}", file=sys.stderr)
         sys.exit(1)
 
+    progress_path = args.progress or f"{args.file}.progress.jsonl"
+    report_path = args.report or f"{args.file}.failures.csv"
+    if args.restart and os.path.exists(progress_path):
+        os.remove(progress_path)
+    done = read_progress(progress_path)
+
+    pending = []
+    failures = []  # (line, hack-id, error)
+    skipped = 0
+    hack_ids = {}
     with open(args.file, newline="", encoding="utf-8-sig") as fh:
         reader = csv.DictReader(fh)
         if reader.fieldnames is None:
@@ -43,27 +147,61 @@ def main():
             # skip empty rows
             if not any(v.strip() if isinstance(v, str) else v for v in row.values()):
                 continue
-            try:
-                resp = post_row(args.url, row, retries=args.retries)
-            except Exception as e:
-                print(f"Row {i}: ERROR - Exception while posting: {e}", file=sys.stderr)
-                sys.exit(1)
+            hack_ids[i] = row.get("hack-id")
+            if done.get(i, False) == row.get("hack-id"):
+                skipped += 1
+                continue
+            # the server would reject it anyway, don't spend a round-trip on it
+            car, errors = coerce_car(row)
+            if car is None:
+                failures.append((i, row.get("hack-id"), f"Invalid row: {errors}"))
+                continue
+            pending.append((i, row))
 
-            if resp is None:
-                print(f"Row {i}: ERROR - No response returned from server.", file=sys.stderr)
-                sys.exit(1)
+    _size_pool(args.workers)
+    if args.batch_size > 0:
+        url = args.bulk_url or args.url.rstrip("/") + "/bulk"
+        timeout = args.timeout or 30.0
+        jobs = [pending[i:i + args.batch_size] for i in range(0, len(pending), args.batch_size)]
+        upload = upload_batch
+    else:
+        url = args.url
+        timeout = args.timeout or 5.0
+        jobs = pending
+        upload = upload_row
 
-            if not resp.ok:
-                body = ""
-                try:
-                    body = resp.text
-                except Exception:
-                    body = "<could not read response body>"
-                print(f"Row {i}: FAIL - HTTP {resp.status_code}. Response: {body}", file=sys.stderr)
-                sys.exit(1)
+    print(f"Uploading {len(pending)} rows to {url} with {args.workers} workers"
+          f"{f' in batches of {args.batch_size}' if args.batch_size > 0 else ''}; "
+          f"{skipped} already done, {len(failures)} invalid")
+    start = time.perf_counter()
+    uploaded = 0
+    with open(progress_path, "a", encoding="utf-8") as progress, \
+            ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(upload, url, job, args.retries, timeout) for job in jobs]
+        for future in as_completed(futures):
+            for line, status, error in future.result():
+                progress.write(json.dumps({"line": line, "hack-id": hack_ids[line], "status": status, "error": error}) + "\n")
+                if status == "ok":
+                    uploaded += 1
+                else:
+                    failures.append((line, hack_ids[line], error))
+                    print(f"Row {line}: FAIL - {error}", file=sys.stderr)
+            progress.flush()
+    elapsed = time.perf_counter() - start
 
-            print(f"Row {i}: OK ({resp.status_code})")
+    failures.sort()
+    with open(report_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["line", "hack-id", "error"])
+        writer.writerows(failures)
+
+    rate = uploaded / elapsed if elapsed > 0 else 0.0
+    print(f"Uploaded {uploaded} rows in {elapsed:.2f}s ({rate:.1f} rows/s); "
+          f"{len(failures)} failed, {skipped} skipped as already done")
+    if failures:
+        print(f"Failures written to {report_path}; rerun to retry them", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
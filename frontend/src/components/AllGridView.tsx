@@ -31,6 +31,9 @@ interface ApiCar {
   estimated_current_cost: number;
 }
 
+// Only the fields the grid cards use, so pages stay small
+const GRID_FIELDS = "id,year,make,model,trim,type,img_path,msrp,estimated_current_cost,epa_city_mpg,epa_highway_mpg,horsepower_hp";
+
 interface ApiResponse {
   cars: ApiCar[];
   pagination: {
@@ -101,7 +104,7 @@ export function AllGridView({ selectedIds = [], onToggleSelect, onCompare, quizA
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(`http://127.0.0.1:5000/data/cars?page=${page}`);
+      const response = await fetch(`http://127.0.0.1:5000/data/cars?page=${page}&fields=${GRID_FIELDS}`);
       if (!response.ok) throw new Error('Failed to fetch cars');
       
       const data: ApiResponse = await response.json();